@@ -21,8 +21,40 @@
 """A verification database based on filelists
 """
 
-from .query import Database
-from .models import Client, File
+import sys
+import importlib
+
+# the classes are imported only when they are used for the first time,
+# so that the driver can be loaded without importing bob.db.verification.utils
+_lazy_attributes = {
+  'Database' : 'query',
+  'FederatedDatabase' : 'federated',
+  'Client' : 'models',
+  'File' : 'models',
+  'FileList' : 'models',
+}
+
+# the sub-modules that are accessible as attributes, as if they had been imported
+_submodules = ('aio', 'arrays', 'benchmark', 'catalog', 'columnar', 'driver', 'federated', 'models', 'prefetch', 'query', 'sampling', 'scores', 'server', 'shared', 'sql', 'stats', 'trials', 'validate')
+
+if sys.version_info < (3, 7):
+  # module level __getattr__ (PEP 562) requires Python 3.7
+  from .query import Database
+  from .federated import FederatedDatabase
+  from .models import Client, File, FileList
+
+else:
+  def __getattr__(name):
+    if name in _lazy_attributes:
+      value = getattr(importlib.import_module('.' + _lazy_attributes[name], __name__), name)
+      globals()[name] = value
+      return value
+    if name in _submodules:
+      return importlib.import_module('.' + name, __name__)
+    raise AttributeError("module '%s' has no attribute '%s'" % (__name__, name))
+
+  def __dir__():
+    return sorted(set(globals()) | set(_lazy_attributes))
 
 def get_config():
   """Returns a string containing the configuration information.
@@ -32,4 +64,4 @@ def get_config():
 
 
 # gets sphinx autodoc done right - don't remove it
-__all__ = [_ for _ in dir() if not _.startswith('_')]
+__all__ = sorted(list(_lazy_attributes) + ['get_config'])
@@ -0,0 +1,76 @@
+#!/usr/bin/env python
+# vim: set fileencoding=utf-8 :
+#
+# Copyright (C) 2011-2013 Idiap Research Institute, Martigny, Switzerland
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, version 3 of the License.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""The implementation of the :py:mod:`asyncio` interface of the :py:class:`bob.db.verification.filelist.Database`.
+
+Parsing of the file lists and reading of annotation files are run in an executor, so that the event loop is not blocked.
+Concurrent requests for the same list file are coalesced, and the read lists are stored in the cache of the database, which is shared with the synchronous interface.
+"""
+
+import asyncio
+import functools
+
+
+async def _read_list(database, group, type, list_file, executor):
+  """Reads the given list into the cache of the database; concurrent calls for the same list file wait for the first one."""
+  pending = database.m_pending_lists
+  if list_file in pending:
+    return await asyncio.shield(pending[list_file])
+  future = asyncio.get_running_loop().run_in_executor(executor, database.m_list_reader.read_list, list_file, group, type)
+  pending[list_file] = future
+  try:
+    return await asyncio.shield(future)
+  finally:
+    if pending.get(list_file) is future:
+      del pending[list_file]
+
+
+async def _read_lists(database, lists, executor):
+  await asyncio.gather(*[_read_list(database, group, type, list_file, executor) for group, type, list_file in lists])
+
+
+async def preload(database, protocol = None, groups = None, executor = None):
+  await _read_lists(database, database.list_files(protocol, groups), executor)
+
+
+async def objects(database, protocol = None, purposes = None, model_ids = None, groups = None, classes = None, executor = None):
+  # read the lists that are required by the query
+  check = database.check_parameters_for_validity
+  purposes = check(purposes, "purpose", ('enroll', 'probe'))
+  groups = check(groups, "group", ('dev', 'eval', 'world', 'optional_world_1', 'optional_world_2'), default_parameters=('dev', 'eval', 'world'))
+  types = []
+  if 'enroll' in purposes:
+    types.append('for_models')
+  if 'probe' in purposes:
+    types.append('for_probes' if database.m_use_dense_probes else 'for_scores')
+  lists = [(group, type, list_file) for group, type, list_file in database.list_files(protocol, groups) if type is None or type in types]
+  await _read_lists(database, lists, executor)
+
+  # filtering the (cached) lists might also take a while
+  query = functools.partial(database.objects, protocol = protocol, purposes = purposes, model_ids = model_ids, groups = groups, classes = classes)
+  return await asyncio.get_running_loop().run_in_executor(executor, query)
+
+
+async def annotations_batch(database, files, executor = None):
+  # read the annotations of each file only once
+  loop = asyncio.get_running_loop()
+  futures = {}
+  for file in files:
+    if file.id not in futures:
+      futures[file.id] = loop.run_in_executor(executor, database.annotations, file)
+  annotations = dict(zip(futures.keys(), await asyncio.gather(*futures.values())))
+  return [annotations[file.id] for file in files]
@@ -0,0 +1,235 @@
+#!/usr/bin/env python
+# vim: set fileencoding=utf-8 :
+#
+# Copyright (C) 2011-2013 Idiap Research Institute, Martigny, Switzerland
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, version 3 of the License.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""NumPy representations of the trials of a protocol.
+
+Ids and file names are stored in tables, i.e., arrays of strings, and referred to by their integer index in these tables.
+This module requires NumPy, which is imported when the functions are used; it is installed with the ``arrays`` extra of this package.
+"""
+
+import collections
+
+
+class _Table:
+  """Assigns consecutive integer codes to strings, in the order of their first appearance."""
+
+  def __init__(self):
+    self.m_codes = {}
+    # the values in the order of their codes, since dictionaries keep the order of insertion only from Python 3.7 on
+    self.m_values = []
+
+  def code(self, value):
+    code = self.m_codes.setdefault(value, len(self.m_values))
+    if code == len(self.m_values):
+      self.m_values.append(value)
+    return code
+
+  def __len__(self):
+    return len(self.m_values)
+
+  def array(self):
+    import numpy
+    return numpy.array(self.m_values, dtype = str)
+
+
+def _read_only(**arrays):
+  """Marks the given arrays as read-only, so that they can be shared between callers."""
+  for array in arrays.values():
+    array.flags.writeable = False
+  return arrays
+
+
+ZTAlignment = collections.namedtuple('ZTAlignment', (
+  'client_ids',
+  'model_ids', 'model_clients',
+  'probe_ids', 'probe_clients',
+  'trial_models', 'trial_probes',
+  'tmodel_ids', 'tmodel_clients',
+  'tfiles', 'tfile_ids', 'tfile_models',
+  'zfile_ids', 'zfile_clients',
+))
+ZTAlignment.__doc__ = """The alignment of models, probes, T-Norm models and Z-Norm files of one protocol and group.
+
+The ``client_ids``, ``model_ids``, ``probe_ids``, ``tmodel_ids``, ``tfiles`` and ``zfile_ids`` are arrays of strings; ``*_clients`` are indexes into ``client_ids``.
+The scores of the trials ``(model_ids[trial_models[i]], probe_ids[trial_probes[i]])`` fill the raw score matrix.
+The T-Norm models are enrolled from the pairs ``(tfiles[tfile_ids[i]], tmodel_ids[tfile_models[i]])``, one for each file and T-Norm model, so that a file that is used by several T-Norm models appears once for each of them.
+For instance, the mask of the Z-Norm files of the same client as the T-Norm models is ``tmodel_clients[:,None] == zfile_clients[None,:]``.
+"""
+
+
+def zt_alignment(database, protocol = None, group = 'dev'):
+  """Computes the :py:class:`ZTAlignment` of the given protocol and group; use :py:meth:`bob.db.verification.filelist.Database.zt_alignment` instead, which caches the result."""
+  import numpy
+  reader = database.m_list_reader
+  clients = _Table()
+
+  # the models in the order of the list
+  model_dict = reader.read_models(database.get_list_file(group, 'for_models', protocol), group, 'for_models')
+  models = _Table()
+  model_clients = []
+  for model_id, client_id in model_dict.items():
+    models.code(model_id)
+    model_clients.append(clients.code(client_id))
+
+  # the probes in the order of their first appearance
+  probes = _Table()
+  probe_clients = []
+  trial_models, trial_probes = [], []
+  if database.m_use_dense_probes:
+    for file in reader.read_list(database.get_list_file(group, 'for_probes', protocol), group, 'for_probes'):
+      if file.id not in probes.m_codes:
+        probes.code(file.id)
+        probe_clients.append(clients.code(file.client_id))
+    # all probes are compared to all models
+    trial_models = numpy.repeat(numpy.arange(len(models), dtype = numpy.int32), len(probes))
+    trial_probes = numpy.tile(numpy.arange(len(probes), dtype = numpy.int32), len(models))
+  else:
+    for file in reader.read_list(database.get_list_file(group, 'for_scores', protocol), group, 'for_scores'):
+      if file._model_id not in models.m_codes:
+        raise ValueError("The model id '%s' of the probe file '%s' is not contained in the models of group '%s'" % (file._model_id, file.id, group))
+      if file.id not in probes.m_codes:
+        probes.code(file.id)
+        probe_clients.append(clients.code(file.client_id))
+      trial_models.append(models.code(file._model_id))
+      trial_probes.append(probes.code(file.id))
+    trial_models = numpy.array(trial_models, dtype = numpy.int32)
+    trial_probes = numpy.array(trial_probes, dtype = numpy.int32)
+
+  tmodels, tfiles = _Table(), _Table()
+  tmodel_clients, tfile_ids, tfile_models = [], [], []
+  zfiles = _Table()
+  zfile_clients = []
+  if database.implements_zt(protocol, group):
+    for model_id, client_id in reader.read_models(database.get_list_file(group, 'for_tnorm', protocol), group, 'for_tnorm').items():
+      tmodels.code(model_id)
+      tmodel_clients.append(clients.code(client_id))
+    # one row for each file and T-Norm model
+    tpairs = set()
+    for file in reader.read_list(database.get_list_file(group, 'for_tnorm', protocol), group, 'for_tnorm'):
+      pair = (tfiles.code(file.id), tmodels.code(file._model_id))
+      if pair not in tpairs:
+        tpairs.add(pair)
+        tfile_ids.append(pair[0])
+        tfile_models.append(pair[1])
+    for file in reader.read_list(database.get_list_file(group, 'for_znorm', protocol), group, 'for_znorm'):
+      if file.id not in zfiles.m_codes:
+        zfiles.code(file.id)
+        zfile_clients.append(clients.code(file.client_id))
+
+  def codes(values):
+    return numpy.array(values, dtype = numpy.int32)
+
+  return ZTAlignment(**_read_only(
+    client_ids = clients.array(),
+    model_ids = models.array(), model_clients = codes(model_clients),
+    probe_ids = probes.array(), probe_clients = codes(probe_clients),
+    trial_models = trial_models, trial_probes = trial_probes,
+    tmodel_ids = tmodels.array(), tmodel_clients = codes(tmodel_clients),
+    tfiles = tfiles.array(), tfile_ids = codes(tfile_ids), tfile_models = codes(tfile_models),
+    zfile_ids = zfiles.array(), zfile_clients = codes(zfile_clients),
+  ))
+
+
+# the groups of the trials, which are stored by their index in this tuple
+TRIAL_GROUPS = ('dev', 'eval')
+
+
+def trial_table(database, protocol = None, groups = None):
+  """Collects the trials of the given protocol into integer arrays and string tables.
+
+  Keyword parameters:
+
+  database : :py:class:`bob.db.verification.filelist.Database`
+    The database that defines the trials
+
+  protocol : str or ``None``
+    The protocol to consider
+
+  groups : str or [str] or ``None``
+    The groups to consider ("dev", "eval")
+
+  Returns: a dictionary of arrays, containing:
+
+  * the string tables ``model_ids``, ``client_ids`` and ``paths``, encoded in UTF-8
+  * the trials ``trial_model`` and ``trial_probe`` as indexes into ``model_ids`` and ``paths``, the ``trial_claimed`` and ``trial_client`` as indexes into ``client_ids``, and the ``trial_group`` as index into :py:data:`TRIAL_GROUPS`
+  * the enrollment files ``enroll_model`` and ``enroll_file`` as indexes into ``model_ids`` and ``paths``
+  """
+  import numpy
+  groups = database.check_parameters_for_validity(groups, "group", TRIAL_GROUPS)
+  reader = database.m_list_reader
+  models, clients, paths = _Table(), _Table(), _Table()
+  trials = dict((name, []) for name in ('trial_model', 'trial_probe', 'trial_claimed', 'trial_client', 'trial_group'))
+  enroll_model, enroll_file = [], []
+
+  for group in groups:
+    group_code = TRIAL_GROUPS.index(group)
+    model_dict = reader.read_models(database.get_list_file(group, 'for_models', protocol), group, 'for_models')
+    for file in reader.read_list(database.get_list_file(group, 'for_models', protocol), group, 'for_models'):
+      enroll_model.append(models.code(file._model_id))
+      enroll_file.append(paths.code(file.path))
+
+    if database.m_use_dense_probes:
+      # all probes are compared to all models of the group; as in DenseTrials, each probe file is used once
+      probes, probe_paths = [], set()
+      for file in reader.read_list(database.get_list_file(group, 'for_probes', protocol), group, 'for_probes'):
+        if file.path not in probe_paths:
+          probe_paths.add(file.path)
+          probes.append(file)
+      probe_codes = numpy.array([paths.code(file.path) for file in probes], dtype = numpy.int32)
+      probe_clients = numpy.array([clients.code(file.client_id) for file in probes], dtype = numpy.int32)
+      for model_id, client_id in model_dict.items():
+        trials['trial_model'].append(numpy.full(len(probes), models.code(model_id), dtype = numpy.int32))
+        trials['trial_probe'].append(probe_codes)
+        trials['trial_claimed'].append(numpy.full(len(probes), clients.code(client_id), dtype = numpy.int32))
+        trials['trial_client'].append(probe_clients)
+        trials['trial_group'].append(numpy.full(len(probes), group_code, dtype = numpy.int8))
+    else:
+      probes = reader.read_list(database.get_list_file(group, 'for_scores', protocol), group, 'for_scores')
+      trials['trial_model'].append(numpy.array([models.code(file._model_id) for file in probes], dtype = numpy.int32))
+      trials['trial_probe'].append(numpy.array([paths.code(file.path) for file in probes], dtype = numpy.int32))
+      trials['trial_claimed'].append(numpy.array([clients.code(file.claimed_id) for file in probes], dtype = numpy.int32))
+      trials['trial_client'].append(numpy.array([clients.code(file.client_id) for file in probes], dtype = numpy.int32))
+      trials['trial_group'].append(numpy.full(len(probes), group_code, dtype = numpy.int8))
+
+  retval = {}
+  for name, parts in trials.items():
+    retval[name] = numpy.concatenate(parts) if parts else numpy.zeros(0, dtype = numpy.int8 if name == 'trial_group' else numpy.int32)
+  retval['enroll_model'] = numpy.array(enroll_model, dtype = numpy.int32)
+  retval['enroll_file'] = numpy.array(enroll_file, dtype = numpy.int32)
+  for name, table in (('model_ids', models), ('client_ids', clients), ('paths', paths)):
+    # fixed-width byte strings can be memory mapped, other than Python objects
+    retval[name] = numpy.char.encode(table.array(), 'utf-8') if len(table) else numpy.zeros(0, dtype = 'S1')
+  return retval
+
+
+def export_trials(database, directory, protocol = None, groups = None):
+  """Writes the :py:func:`trial_table` of the given protocol into the given directory.
+
+  Each array is written into a separate ``.npy`` file, which can be opened without this package, e.g., with ``numpy.load(os.path.join(directory, 'trial_model.npy'), mmap_mode='r')``.
+
+  Returns: the names of the written files
+  """
+  import os
+  import numpy
+  if not os.path.isdir(directory):
+    os.makedirs(directory)
+  retval = []
+  for name, array in sorted(trial_table(database, protocol, groups).items()):
+    file_name = os.path.join(directory, name + '.npy')
+    numpy.save(file_name, array)
+    retval.append(file_name)
+  return retval
@@ -0,0 +1,102 @@
+#!/usr/bin/env python
+# vim: set fileencoding=utf-8 :
+#
+# Copyright (C) 2011-2013 Idiap Research Institute, Martigny, Switzerland
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, version 3 of the License.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""Simple benchmarks of the Verification Filelists database.
+
+Run ``python -m bob.db.verification.filelist.benchmark --help`` for the list of benchmarks.
+"""
+
+import sys
+import pickle
+import timeit
+
+
+def _round_trip(obj, repetitions):
+  """Returns the size of the pickled object and the mean time of pickling and unpickling it."""
+  data = pickle.dumps(obj, pickle.HIGHEST_PROTOCOL)
+  seconds = timeit.timeit(lambda: pickle.loads(pickle.dumps(obj, pickle.HIGHEST_PROTOCOL)), number = repetitions) / repetitions
+  return len(data), seconds
+
+
+def pickle_benchmark(database, protocol = None, repetitions = 5):
+  """Compares pickling a warm database and the result of its :py:meth:`bob.db.verification.filelist.Database.objects` query with pickling the plain :py:class:`bob.db.verification.filelist.File` objects.
+
+  Returns: a list of tuples ``(name, size in bytes, round-trip time in seconds)``
+  """
+  files = database.objects(protocol = protocol)
+  for group, type, list_file in database.list_files(protocol):
+    database.m_list_reader.read_list(list_file, group, type)
+
+  results = []
+  results.append(('objects() as list',) + _round_trip(list(files), repetitions))
+  results.append(('objects() as FileList',) + _round_trip(files, repetitions))
+  results.append(('lists as dict',) + _round_trip(dict(database.m_list_reader.m_read_lists), repetitions))
+  results.append(('Database',) + _round_trip(database, repetitions))
+  return results
+
+
+# the statements, whose import time is measured; the first one measures the startup of the interpreter
+IMPORT_STATEMENTS = (
+  'pass',
+  'import bob.db.verification.filelist',
+  'import bob.db.verification.filelist.driver; bob.db.verification.filelist.driver.Interface().version()',
+  'from bob.db.verification.filelist import Database',
+)
+
+def import_benchmark(repetitions = 10):
+  """Measures the time to import the package, to load its driver and to import the :py:class:`bob.db.verification.filelist.Database`, each in a new interpreter.
+
+  Returns: a list of tuples ``(statement, mean time in seconds)``, which include the startup time of the interpreter
+  """
+  import subprocess
+  results = []
+  for statement in IMPORT_STATEMENTS:
+    seconds = timeit.timeit(lambda: subprocess.check_call([sys.executable, '-c', statement]), number = repetitions) / repetitions
+    results.append((statement, seconds))
+  return results
+
+
+def main(command_line_parameters = None):
+  import argparse
+  parser = argparse.ArgumentParser(description = __doc__)
+  subparsers = parser.add_subparsers(dest = 'benchmark')
+
+  parser_pickle = subparsers.add_parser('pickle', help = pickle_benchmark.__doc__.split('\n')[0])
+  parser_pickle.add_argument('list_directory', help = "The directory which contains the file lists.")
+  parser_pickle.add_argument('-p', '--protocol', help = "The protocol to use.")
+  parser_pickle.add_argument('-r', '--repetitions', type = int, default = 5, help = "The number of repetitions.")
+
+  parser_import = subparsers.add_parser('import', help = import_benchmark.__doc__.split('\n')[0])
+  parser_import.add_argument('-r', '--repetitions', type = int, default = 10, help = "The number of repetitions.")
+
+  args = parser.parse_args(command_line_parameters)
+
+  if args.benchmark == 'pickle':
+    from .query import Database
+    db = Database(args.list_directory, use_dense_probe_file_list = False)
+    for name, size, seconds in pickle_benchmark(db, args.protocol, args.repetitions):
+      sys.stdout.write('%-24s %12d bytes %10.3f ms\n' % (name, size, seconds * 1000.))
+  elif args.benchmark == 'import':
+    for statement, seconds in import_benchmark(args.repetitions):
+      sys.stdout.write('%10.3f ms   %s\n' % (seconds * 1000., statement))
+  else:
+    parser.print_help()
+  return 0
+
+
+if __name__ == '__main__':
+  sys.exit(main())
@@ -0,0 +1,138 @@
+#!/usr/bin/env python
+# vim: set fileencoding=utf-8 :
+#
+# Copyright (C) 2011-2013 Idiap Research Institute, Martigny, Switzerland
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, version 3 of the License.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""The catalog of the protocols in the base directory of a :py:class:`bob.db.verification.filelist.Database`.
+
+The description of each protocol is stored in a manifest file in the base directory.
+It is computed again only when the list files of the protocol have changed, i.e., when list files were added, removed or modified.
+"""
+
+import os
+import json
+
+from .models import _signature
+from .stats import summarize_list
+
+# the name of the manifest file in the base directory
+MANIFEST_FILE = '.protocol_catalog.json'
+
+
+def protocol_names(database):
+  """Returns the sorted names of the sub-directories of the base directory that contain file lists."""
+  base_dir = database.get_base_directory()
+  return sorted(name for name in os.listdir(base_dir) if os.path.isdir(os.path.join(base_dir, name)) and database.groups(name))
+
+
+def _protocol_signature(database, protocol):
+  # the list files of the protocol (relative to the base directory) with their size and modification time
+  prefix = len(os.path.join(database.get_base_directory(), ''))
+  return [[list_file[prefix:]] + list(_signature(os.stat(list_file))) for _, _, list_file in database.list_files(protocol)]
+
+
+def _describe(database, protocol):
+  """Reads the lists of the given protocol and describes them."""
+  lists = database.list_files(protocol)
+  types = set(type for _, type, _ in lists)
+  if 'for_probes' in types and 'for_scores' in types:
+    probe_mode = 'both'
+  elif 'for_probes' in types:
+    probe_mode = 'dense'
+  elif 'for_scores' in types:
+    probe_mode = 'sparse'
+  else:
+    probe_mode = None
+
+  rows, models, clients = {}, {}, {}
+  for group, type, list_file in lists:
+    summary = summarize_list(list_file, database.m_list_reader._column_count(group, type))
+    rows.setdefault(group, {})[type or 'world'] = summary.rows
+    # the same clients as given by Database.client_ids
+    if type is None or type == 'for_models':
+      clients[group] = len(summary.clients)
+    if type == 'for_models':
+      models[group] = len(summary.models)
+
+  groups = database.groups(protocol)
+  return {
+    'groups' : groups,
+    'probe_mode' : probe_mode,
+    'zt_groups' : [group for group in ('dev', 'eval') if group in groups and database.implements_zt(protocol, group)],
+    'rows' : rows,
+    'models' : models,
+    'clients' : clients,
+  }
+
+
+def protocol_catalog(database, protocols = None):
+  """Describes the given protocols, using the manifest file of the base directory when the list files did not change.
+
+  Keyword parameters:
+
+  database : :py:class:`bob.db.verification.filelist.Database`
+    The database, whose protocols should be described
+
+  protocols : str or [str] or ``None``
+    The protocols to describe; by default, all :py:func:`protocol_names` are described
+
+  Returns: a dictionary from protocol names to dictionaries with the keys:
+
+  * ``groups``: the available groups, see :py:meth:`bob.db.verification.filelist.Database.groups`
+  * ``probe_mode``: ``'dense'`` if only a ``for_probes`` list, ``'sparse'`` if only a ``for_scores`` list exists, ``'both'`` or ``None``
+  * ``zt_groups``: the groups that provide the lists for ZT score normalization
+  * ``rows``: the number of lines in each list, by group and type (``'world'`` for the training lists)
+  * ``models`` and ``clients``: the number of models and clients of each group
+  """
+  if protocols is None:
+    protocols = protocol_names(database)
+  elif isinstance(protocols, str):
+    protocols = (protocols,)
+
+  manifest_file = os.path.join(database.get_base_directory(), MANIFEST_FILE)
+  manifest = database.m_protocol_manifest
+  if manifest is None:
+    try:
+      with open(manifest_file) as f:
+        manifest = json.load(f)
+    except (IOError, ValueError):
+      manifest = None
+    if not isinstance(manifest, dict) or manifest.get('version') != 1:
+      manifest = {'version' : 1, 'protocols' : {}}
+    database.m_protocol_manifest = manifest
+
+  changed = False
+  retval = {}
+  for protocol in protocols:
+    signature = _protocol_signature(database, protocol)
+    entry = manifest['protocols'].get(protocol)
+    if entry is None or entry['signature'] != signature:
+      entry = _describe(database, protocol)
+      entry['signature'] = signature
+      manifest['protocols'][protocol] = entry
+      changed = True
+    retval[protocol] = dict((key, value) for key, value in entry.items() if key != 'signature')
+
+  if changed:
+    # the manifest file is only an optimization, the base directory might not be writable
+    temp_file = '%s.%d' % (manifest_file, os.getpid())
+    try:
+      with open(temp_file, 'w') as f:
+        json.dump(manifest, f)
+      os.replace(temp_file, manifest_file)
+    except (IOError, OSError):
+      if os.path.exists(temp_file):
+        os.remove(temp_file)
+  return retval
@@ -0,0 +1,139 @@
+#!/usr/bin/env python
+# vim: set fileencoding=utf-8 :
+#
+# Copyright (C) 2011-2013 Idiap Research Institute, Martigny, Switzerland
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, version 3 of the License.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""A compact columnar representation of lists of :py:class:`bob.db.verification.filelist.File` objects.
+
+The buffer consists of a header, the offsets of all unique strings, four index columns (path, client id, model id, claimed id) and the UTF-8 encoded strings.
+All integer arrays are 4-byte aligned, so that they can be used directly from a (shared) memory buffer without copying.
+"""
+
+import array
+import gc
+import struct
+import sys
+
+from .models import File, FileList
+
+# magic, byte order, number of rows, number of unique strings
+_HEADER = struct.Struct('<4s4sII')
+_MAGIC = b'BFL1'
+_BYTE_ORDER = b'LE  ' if sys.byteorder == 'little' else b'BE  '
+_COLUMNS = 4
+# memoryview.cast() requires Python 3.3; before, the integer columns are copied
+_CAST = hasattr(memoryview, 'cast')
+
+
+def _tobytes(values):
+  # array.tobytes() and array.frombytes() require Python 3.2
+  return values.tobytes() if hasattr(values, 'tobytes') else values.tostring()
+
+def _frombytes(values, data):
+  if hasattr(values, 'frombytes'):
+    values.frombytes(data)
+  else:
+    values.fromstring(data)
+
+
+def encode_files(files):
+  """Encodes the given list of :py:class:`File` objects into a compact :py:class:`bytes` buffer."""
+  # each unique string gets the next index
+  indexes = {}
+  columns = [array.array('I') for _ in range(_COLUMNS)]
+  paths, client_ids, model_ids, claimed_ids = (column.append for column in columns)
+  for file in files:
+    paths(indexes.setdefault(file.path, len(indexes)))
+    client_ids(indexes.setdefault(file.client_id, len(indexes)))
+    model_ids(indexes.setdefault(file._model_id, len(indexes)))
+    claimed_ids(indexes.setdefault(file.claimed_id, len(indexes)))
+
+  # the strings are ordered by their index, since dictionaries keep the order of insertion only from Python 3.7 on
+  strings = [None] * len(indexes)
+  for string, index in indexes.items():
+    strings[index] = string
+  encoded = [s.encode('utf-8') for s in strings]
+  offsets = array.array('I', [0])
+  for s in encoded:
+    offsets.append(offsets[-1] + len(s))
+
+  parts = [_HEADER.pack(_MAGIC, _BYTE_ORDER, len(columns[0]), len(encoded)), _tobytes(offsets)]
+  parts.extend(_tobytes(column) for column in columns)
+  parts.extend(encoded)
+  return b''.join(parts)
+
+
+def _uint32(buffer, start, count, swap):
+  """Returns a view to ``count`` unsigned integers at the given position of the buffer."""
+  if not swap and _CAST:
+    return buffer[start : start + 4 * count].cast('I')
+  # buffers from machines with a different byte order need to be converted
+  values = array.array('I')
+  _frombytes(values, buffer[start : start + 4 * count].tobytes())
+  if swap:
+    values.byteswap()
+  return values
+
+
+def decode_files(buffer):
+  """Decodes a buffer generated by :py:func:`encode_files` into a list of :py:class:`File` objects.
+
+  The ``buffer`` can be any object supporting the buffer protocol; the integer columns are not copied.
+  """
+  buffer = memoryview(buffer)
+  if _CAST:
+    buffer = buffer.cast('B')
+  magic, byte_order, rows, count = _HEADER.unpack_from(buffer)
+  if magic != _MAGIC:
+    raise ValueError("The given buffer does not contain a list of files.")
+  swap = byte_order != _BYTE_ORDER
+
+  position = _HEADER.size
+  offsets = _uint32(buffer, position, count + 1, swap)
+  position += 4 * (count + 1)
+  columns = []
+  for _ in range(_COLUMNS):
+    columns.append(_uint32(buffer, position, rows, swap))
+    position += 4 * rows
+
+  # decode each unique string only once
+  blob = buffer[position : position + offsets[count]].tobytes()
+  strings = [blob[offsets[i] : offsets[i+1]].decode('utf-8') for i in range(count)]
+
+  # the files are created without calling the constructor, using the attributes that the constructor sets
+  attributes = File(file_name = '', client_id = '').__dict__
+  new = object.__new__
+  retval = []
+  append = retval.append
+  # the new objects cannot form reference cycles, so the garbage collector does not need to track them
+  gc_enabled = gc.isenabled()
+  gc.disable()
+  try:
+    for path, client_id, model_id, claimed_id in zip(*[map(strings.__getitem__, column.tolist()) for column in columns]):
+      file = new(File)
+      file.__dict__ = values = attributes.copy()
+      values['id'] = values['path'] = path
+      values['client_id'] = client_id
+      values['_model_id'] = model_id
+      values['claimed_id'] = claimed_id
+      append(file)
+  finally:
+    if gc_enabled:
+      gc.enable()
+  return retval
+
+def _file_list(buffer):
+  """Restores a pickled :py:class:`FileList`."""
+  return FileList(decode_files(buffer))
@@ -30,20 +30,20 @@ def dumplist(args):
   from .query import Database
   db = Database(args.list_directory, use_dense_probe_file_list = False)
 
-  r = db.objects(
+  r = db.paths(dict(
       purposes=args.purpose,
       groups=args.group,
       classes=args.sclass,
       protocol=args.protocol
-  )
+  ), directory=args.directory, extension=args.extension)
 
   output = sys.stdout
   if args.selftest:
     from bob.db.base.utils import null
     output = null()
 
-  for f in r:
-    output.write('%s\n' % f.make_path(directory=args.directory,extension=args.extension))
+  for path in r:
+    output.write('%s\n' % path)
 
   return 0
 
@@ -53,14 +53,14 @@ def checkfiles(args):
   from .query import Database
   db = Database(args.list_directory, use_dense_probe_file_list = False)
 
-  r = db.objects(protocol=args.protocol)
+  r = db.paths(dict(protocol=args.protocol), args.directory, args.extension)
 
   # go through all files, check if they are available on the filesystem
   good = []
   bad = []
-  for f in r:
-    if os.path.exists(f.make_path(args.directory, args.extension)): good.append(f)
-    else: bad.append(f)
+  for path in r:
+    if os.path.exists(path): good.append(path)
+    else: bad.append(path)
 
   # report
   output = sys.stdout
@@ -69,21 +69,181 @@ def checkfiles(args):
     output = null()
 
   if bad:
-    for f in bad:
-      output.write('Cannot find file "%s"\n' % f.make_path(args.directory, args.extension))
+    for path in bad:
+      output.write('Cannot find file "%s"\n' % path)
     output.write('%d files (out of %d) were not found at "%s"\n' % \
         (len(bad), len(r), args.directory))
 
   return 0
 
+def stats(args):
+  """Prints statistics of the file lists of one or more protocols"""
+
+  from .query import Database
+  from .stats import protocol_statistics
+  db = Database(args.list_directory, use_dense_probe_file_list = args.dense)
+
+  protocols = args.protocols or db.protocols() or [None]
+  if args.parallel > 1 and len(protocols) > 1:
+    # the protocols are summarized in several processes
+    import concurrent.futures
+    with concurrent.futures.ProcessPoolExecutor(args.parallel) as pool:
+      results = list(pool.map(protocol_statistics, [db] * len(protocols), protocols))
+  else:
+    results = [protocol_statistics(db, protocol) for protocol in protocols]
+
+  output = sys.stdout
+  if args.selftest:
+    from bob.db.base.utils import null
+    output = null()
+
+  groups = ('world', 'optional_world_1', 'optional_world_2', 'dev', 'eval')
+  for protocol, result in zip(protocols, results):
+    for group in sorted(result, key = groups.index):
+      for key, value in sorted(result[group].items()):
+        if key == 'files_per_model':
+          value = '%d / %.2f / %d' % value
+        output.write('%-20s %-16s %-16s %s\n' % (protocol or '-', group, key, value))
+
+  return 0
+
+def compile_sql(args):
+  """Compiles the file lists into an indexed SQLite file"""
+
+  from .query import Database
+  from .sql import compile_lists
+  db = Database(args.list_directory, use_dense_probe_file_list = False)
+
+  count = compile_lists(db, args.output, args.protocols or None)
+
+  if not args.selftest:
+    sys.stdout.write('Wrote %d file lists to "%s"\n' % (count, args.output))
+
+  return 0
+
+def serve(args):
+  """Answers queries for the file lists over a Unix domain socket"""
+
+  from .query import Database
+  from .server import serve
+  db = Database(args.list_directory, use_dense_probe_file_list = args.dense)
+
+  try:
+    serve(db, args.socket, args.protocols or None)
+  except KeyboardInterrupt:
+    pass
+
+  return 0
+
+def validate(args):
+  """Checks the file lists for errors and inconsistencies"""
+
+  from .query import Database
+  from .validate import validate
+  db = Database(args.list_directory, use_dense_probe_file_list = False)
+
+  output = sys.stdout
+  if args.selftest:
+    from bob.db.base.utils import null
+    output = null()
+
+  problems = []
+  for protocol in args.protocols or (None,):
+    problems.extend(validate(db, protocol, not args.no_duplicates))
+
+  for problem in problems:
+    location = problem.list_file or args.list_directory
+    if problem.line is not None:
+      location += ':%d' % problem.line
+    output.write('%s: %s: %s\n' % (location, problem.kind, problem.message))
+  output.write('%d problems were found\n' % len(problems))
+
+  # a non-zero exit code allows to use this command as a check before submitting lists
+  return 1 if problems else 0
+
+def labelscores(args):
+  """Labels the lines of a score file as genuine or impostor trials"""
+
+  from .query import Database
+  from .scores import label_score_file, GENUINE, IMPOSTOR
+  if args.split and not args.output and not args.selftest:
+    raise ValueError("The --split option requires an --output file name")
+  db = Database(args.list_directory, use_dense_probe_file_list = args.dense)
+
+  labeller, lines = label_score_file(db, args.score_file, args.protocol, args.group)
+
+  if args.selftest:
+    from bob.db.base.utils import null
+    outputs = {GENUINE : null(), IMPOSTOR : null()}
+  elif args.split:
+    # genuine and impostor scores are written into separate files
+    outputs = dict((label, open('%s.%s' % (args.output, label), 'w')) for label in (GENUINE, IMPOSTOR))
+  else:
+    output = open(args.output, 'w') if args.output else sys.stdout
+    outputs = None
+
+  try:
+    for label, line in lines:
+      if outputs is not None:
+        if label in outputs:
+          outputs[label].write(line)
+      else:
+        output.write('%s %s' % (label, line))
+  finally:
+    if outputs is not None:
+      for output in outputs.values():
+        output.close()
+    elif output is not sys.stdout:
+      output.close()
+
+  # report the trials that do not match the protocol
+  import itertools
+  missing = labeller.missing_count()
+  report = sys.stderr
+  if args.selftest:
+    from bob.db.base.utils import null
+    report = null()
+  for model_id, probe_path in itertools.islice(labeller.missing(), 10):
+    report.write('Missing trial of model "%s" and probe "%s"\n' % (model_id, probe_path))
+  if missing or labeller.unexpected():
+    report.write('%d trials (out of %d) are missing and %d lines are unexpected in "%s"\n' % (missing, len(labeller), labeller.unexpected(), args.score_file))
+    return 1
+
+  return 0
+
+def export(args):
+  """Exports the trials of a protocol as memory-mappable NumPy arrays"""
+
+  try:
+    import numpy
+  except ImportError:
+    sys.stderr.write('The export command requires NumPy, which is installed with "pip install bob.db.verification.filelist[arrays]"\n')
+    return 1
+
+  from .query import Database
+  from .arrays import export_trials
+  db = Database(args.list_directory, use_dense_probe_file_list = args.dense)
+
+  files = export_trials(db, args.output, args.protocol, args.groups or None)
+
+  if not args.selftest:
+    sys.stdout.write('Wrote %d arrays to "%s"\n' % (len(files), args.output))
+
+  return 0
+
 class Interface(BaseInterface):
 
   def name(self):
     return 'verification.filelist'
 
   def version(self):
-    import pkg_resources  # part of setuptools
-    return pkg_resources.require('bob.db.%s' % self.name())[0].version
+    try:
+      from importlib.metadata import version
+    except ImportError:
+      # Python < 3.8; importing pkg_resources is slow
+      import pkg_resources  # part of setuptools
+      return pkg_resources.require('bob.db.%s' % self.name())[0].version
+    return version('bob.db.%s' % self.name())
 
   def files(self):
     return ()
@@ -121,3 +281,58 @@ class Interface(BaseInterface):
     parser.add_argument('--self-test', dest="selftest", action='store_true', help=argparse.SUPPRESS)
 
     parser.set_defaults(func=checkfiles) #action
+
+    # the "stats" action
+    parser = subparsers.add_parser('stats', help=stats.__doc__)
+    parser.add_argument('-l', '--list-directory', required=True, help="The directory which contains the file lists.")
+    parser.add_argument('-p', '--protocols', nargs='+', help="The protocols (sub-directories of the list directory) to summarize; by default, all protocols are summarized.")
+    parser.add_argument('-j', '--parallel', type=int, default=1, help="The number of processes that summarize the protocols in parallel.")
+    parser.add_argument('--dense', action='store_true', help="Use the 'for_probes.lst' instead of the 'for_scores.lst' lists to count the trials.")
+    parser.add_argument('--self-test', dest="selftest", action='store_true', help=argparse.SUPPRESS)
+    parser.set_defaults(func=stats) #action
+
+    # the "compile" action
+    parser = subparsers.add_parser('compile', help=compile_sql.__doc__)
+    parser.add_argument('-l', '--list-directory', required=True, help="The directory which contains the file lists.")
+    parser.add_argument('-o', '--output', required=True, help="The SQLite file to write; an existing file will be overwritten.")
+    parser.add_argument('-p', '--protocols', nargs='+', help="If set, the lists of these protocols (sub-directories of the list directory) are compiled; by default, the lists of the list directory and of all its protocols are compiled.")
+    parser.add_argument('--self-test', dest="selftest", action='store_true', help=argparse.SUPPRESS)
+    parser.set_defaults(func=compile_sql) #action
+
+    # the "serve" action
+    parser = subparsers.add_parser('serve', help=serve.__doc__)
+    parser.add_argument('-l', '--list-directory', required=True, help="The directory which contains the file lists.")
+    parser.add_argument('-s', '--socket', required=True, help="The file name of the Unix domain socket to listen on.")
+    parser.add_argument('-p', '--protocols', nargs='+', help="If set, the lists of these protocols (sub-directories of the list directory) are read at startup.")
+    parser.add_argument('--dense', action='store_true', help="Use the 'for_probes.lst' instead of the 'for_scores.lst' lists for probing.")
+    parser.set_defaults(func=serve) #action
+
+    # the "validate" action
+    parser = subparsers.add_parser('validate', help=validate.__doc__)
+    parser.add_argument('-l', '--list-directory', required=True, help="The directory which contains the file lists.")
+    parser.add_argument('-p', '--protocols', nargs='+', help="If set, the lists of these protocols (sub-directories of the list directory) are checked; by default, the lists of the list directory and of all its protocols are checked.")
+    parser.add_argument('--no-duplicates', action='store_true', help="Do not check for duplicate lines, which requires memory for each line of a list.")
+    parser.add_argument('--self-test', dest="selftest", action='store_true', help=argparse.SUPPRESS)
+    parser.set_defaults(func=validate) #action
+
+    # the "labelscores" action
+    parser = subparsers.add_parser('labelscores', help=labelscores.__doc__)
+    parser.add_argument('-l', '--list-directory', required=True, help="The directory which contains the file lists.")
+    parser.add_argument('-s', '--score-file', required=True, help="The score file to label, in the four or five column format.")
+    parser.add_argument('-o', '--output', help="The file to write the labelled lines into; the standard output is used if not given.")
+    parser.add_argument('--split', action='store_true', help="Write the genuine and impostor lines into the files OUTPUT.genuine and OUTPUT.impostor, without labels.")
+    parser.add_argument('-g', '--group', default='dev', choices=('dev', 'eval'), help="The group of the score file.")
+    parser.add_argument('-p', '--protocol', default=None, help="If set, the protocol is appended to the directory that contains the file lists.")
+    parser.add_argument('--dense', action='store_true', help="Use the 'for_models.lst' and 'for_probes.lst' instead of the 'for_scores.lst' lists to define the trials.")
+    parser.add_argument('--self-test', dest="selftest", action='store_true', help=argparse.SUPPRESS)
+    parser.set_defaults(func=labelscores) #action
+
+    # the "export" action
+    parser = subparsers.add_parser('export', help=export.__doc__)
+    parser.add_argument('-l', '--list-directory', required=True, help="The directory which contains the file lists.")
+    parser.add_argument('-o', '--output', required=True, help="The directory to write the .npy files into.")
+    parser.add_argument('-g', '--groups', nargs='+', choices=('dev', 'eval'), help="If set, only the trials of these groups are exported.")
+    parser.add_argument('-p', '--protocol', default=None, help="If set, the protocol is appended to the directory that contains the file lists.")
+    parser.add_argument('--dense', action='store_true', help="Use the 'for_models.lst' and 'for_probes.lst' instead of the 'for_scores.lst' lists to define the trials.")
+    parser.add_argument('--self-test', dest="selftest", action='store_true', help=argparse.SUPPRESS)
+    parser.set_defaults(func=export) #action
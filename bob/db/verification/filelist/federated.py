@@ -0,0 +1,200 @@
+#!/usr/bin/env python
+# vim: set fileencoding=utf-8 :
+#
+# Copyright (C) 2011-2013 Idiap Research Institute, Martigny, Switzerland
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, version 3 of the License.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""A database that combines the file lists of several base directories."""
+
+import os
+
+import bob.db.verification.utils
+
+from .models import Client
+
+# the groups of the queries, and the groups that are used by default
+_GROUPS = ('dev', 'eval', 'world', 'optional_world_1', 'optional_world_2')
+_DEFAULT_GROUPS = ('dev', 'eval', 'world')
+_ZT_GROUPS = ('dev', 'eval')
+
+
+class FederatedDatabase (bob.db.verification.utils.ZTDatabase):
+  """Answers the queries of :py:class:`bob.db.verification.filelist.Database` by combining the file lists of several base directories.
+
+  For each base directory, a :py:class:`bob.db.verification.filelist.Database` is created when a query requires the lists of that directory for the first time.
+  When a protocol is given, only the base directories that contain this protocol are queried, and only for the groups that they contain.
+  The results are concatenated in the order of the base directories, keeping only the first :py:class:`bob.db.verification.filelist.File` with a given id.
+  As in :py:meth:`bob.db.verification.filelist.Database.tobjects` and :py:meth:`bob.db.verification.filelist.Database.zobjects`, the T-Norm and Z-Norm files are concatenated without removing files with the same id, e.g., a file that enrolls several T-Norm models.
+
+  Keyword parameters:
+
+  base_dirs : [str]
+    The base directories, which contain the file lists
+
+  kwargs
+    All other parameters of :py:class:`bob.db.verification.filelist.Database`, which are used for all base directories
+  """
+
+  def __init__(self, base_dirs, **kwargs):
+    bob.db.verification.utils.ZTDatabase.__init__(self, original_directory = kwargs.get('original_directory'), original_extension = kwargs.get('original_extension'))
+    if isinstance(base_dirs, str):
+      base_dirs = (base_dirs,)
+    self.m_base_dirs = list(base_dirs)
+    self.m_kwargs = kwargs
+    self.m_databases = [None] * len(self.m_base_dirs)
+
+
+  def __database__(self, index):
+    if self.m_databases[index] is None:
+      from .query import Database
+      self.m_databases[index] = Database(self.m_base_dirs[index], **self.m_kwargs)
+    return self.m_databases[index]
+
+
+  def __sources__(self, protocol, groups = None, valid_groups = None, default_groups = None):
+    # the databases of the base directories that contain the given protocol, and the requested groups that they contain
+    if valid_groups is not None:
+      groups = self.check_parameters_for_validity(groups, "group", valid_groups, default_parameters=default_groups)
+    for index, base_dir in enumerate(self.m_base_dirs):
+      if protocol is None or os.path.isdir(os.path.join(base_dir, protocol)):
+        database = self.__database__(index)
+        if valid_groups is None:
+          yield database, None
+          continue
+        available = [group for group in database.groups(protocol) if group in groups]
+        if available:
+          yield database, available
+
+
+  def __merge_files__(self, results):
+    # keeps the first file of each id
+    file_ids = set()
+    retval = []
+    for files in results:
+      for file in files:
+        if file.id not in file_ids:
+          file_ids.add(file.id)
+          retval.append(file)
+    return retval
+
+
+  def __concatenate_files__(self, results):
+    # keeps all files, as the T-Norm and Z-Norm queries of a single database do
+    retval = []
+    for files in results:
+      retval.extend(files)
+    return retval
+
+
+  def __merge_ids__(self, results):
+    # keeps the order of the first appearance of each id
+    ids = set()
+    retval = []
+    for result in results:
+      for id in result:
+        if id not in ids:
+          ids.add(id)
+          retval.append(id)
+    return retval
+
+
+  def get_base_directories(self):
+    """Returns the base directories of this database."""
+    return list(self.m_base_dirs)
+
+
+  def groups(self, protocol=None):
+    """Returns the groups that are available in any of the base directories for the given protocol."""
+    return self.__merge_ids__(database.groups(protocol) for database, _ in self.__sources__(protocol))
+
+
+  def implements_zt(self, protocol=None, groups=None):
+    """Checks if the file lists for the ZT score normalization are available in all base directories containing the given protocol."""
+    return all(database.implements_zt(protocol, available) for database, available in self.__sources__(protocol, groups, _ZT_GROUPS))
+
+
+  def get_client_id_from_model_id(self, model_id, groups=None, protocol=None):
+    """Returns the client id that is connected to the given model id in the first base directory that contains the model."""
+    for database, available in self.__sources__(protocol, groups, _GROUPS, _DEFAULT_GROUPS):
+      try:
+        return database.get_client_id_from_model_id(model_id, available, protocol)
+      except ValueError:
+        pass
+    raise ValueError("The given model id '%s' cannot be found in one of the groups '%s'" % (model_id, groups))
+
+
+  def get_client_id_from_tmodel_id(self, model_id, groups=None, protocol=None):
+    """Returns the client id that is connected to the given T-Norm model id in the first base directory that contains the model."""
+    for database, available in self.__sources__(protocol, groups, _ZT_GROUPS):
+      try:
+        return database.get_client_id_from_tmodel_id(model_id, available, protocol)
+      except ValueError:
+        pass
+    raise ValueError("The given T-norm model id '%s' cannot be found in one of the groups '%s'" % (model_id, groups))
+
+
+  def clients(self, protocol=None, groups=None):
+    """Returns a list of :py:class:`bob.db.verification.filelist.Client` objects of all base directories, see :py:meth:`bob.db.verification.filelist.Database.clients`."""
+    return [Client(id) for id in self.client_ids(protocol, groups)]
+
+  def tclients(self, protocol=None, groups=None):
+    """Returns a list of T-Norm :py:class:`bob.db.verification.filelist.Client` objects of all base directories, see :py:meth:`bob.db.verification.filelist.Database.tclients`."""
+    return [Client(id) for id in self.tclient_ids(protocol, groups)]
+
+  def zclients(self, protocol=None, groups=None):
+    """Returns a list of Z-Norm :py:class:`bob.db.verification.filelist.Client` objects of all base directories, see :py:meth:`bob.db.verification.filelist.Database.zclients`."""
+    return [Client(id) for id in self.zclient_ids(protocol, groups)]
+
+
+  def client_ids(self, protocol=None, groups=None):
+    """Returns the set of client ids of all base directories, see :py:meth:`bob.db.verification.filelist.Database.client_ids`."""
+    return set(self.__merge_ids__(database.client_ids(protocol, available) for database, available in self.__sources__(protocol, groups, _GROUPS, _DEFAULT_GROUPS)))
+
+  def tclient_ids(self, protocol=None, groups=None):
+    """Returns the set of T-Norm client ids of all base directories, see :py:meth:`bob.db.verification.filelist.Database.tclient_ids`."""
+    return set(self.__merge_ids__(database.tclient_ids(protocol, available) for database, available in self.__sources__(protocol, groups, _ZT_GROUPS)))
+
+  def zclient_ids(self, protocol=None, groups=None):
+    """Returns the set of Z-Norm client ids of all base directories, see :py:meth:`bob.db.verification.filelist.Database.zclient_ids`."""
+    return set(self.__merge_ids__(database.zclient_ids(protocol, available) for database, available in self.__sources__(protocol, groups, _ZT_GROUPS)))
+
+  def model_ids(self, protocol=None, groups=None):
+    """Returns the list of model ids of all base directories, see :py:meth:`bob.db.verification.filelist.Database.model_ids`."""
+    return self.__merge_ids__(database.model_ids(protocol, available) for database, available in self.__sources__(protocol, groups, _GROUPS, _DEFAULT_GROUPS))
+
+  def tmodel_ids(self, protocol=None, groups=None):
+    """Returns the list of T-Norm model ids of all base directories, see :py:meth:`bob.db.verification.filelist.Database.tmodel_ids`."""
+    return self.__merge_ids__(database.tmodel_ids(protocol, available) for database, available in self.__sources__(protocol, groups, _ZT_GROUPS))
+
+
+  def objects(self, protocol=None, purposes=None, model_ids=None, groups=None, classes=None):
+    """Returns the :py:class:`bob.db.verification.filelist.File` objects of all base directories, see :py:meth:`bob.db.verification.filelist.Database.objects`."""
+    return self.__merge_files__(database.objects(protocol, purposes, model_ids, available, classes) for database, available in self.__sources__(protocol, groups, _GROUPS, _DEFAULT_GROUPS))
+
+  def tobjects(self, protocol=None, model_ids=None, groups=None):
+    """Returns the T-Norm :py:class:`bob.db.verification.filelist.File` objects of all base directories, see :py:meth:`bob.db.verification.filelist.Database.tobjects`."""
+    return self.__concatenate_files__(database.tobjects(protocol, model_ids, available) for database, available in self.__sources__(protocol, groups, _ZT_GROUPS))
+
+  def zobjects(self, protocol=None, groups=None):
+    """Returns the Z-Norm :py:class:`bob.db.verification.filelist.File` objects of all base directories, see :py:meth:`bob.db.verification.filelist.Database.zobjects`."""
+    return self.__concatenate_files__(database.zobjects(protocol, available) for database, available in self.__sources__(protocol, groups, _ZT_GROUPS))
+
+
+  def annotations(self, file):
+    """Reads the annotations of the given file, see :py:meth:`bob.db.verification.filelist.Database.annotations`; the annotation directory is shared by all base directories."""
+    return self.__database__(0).annotations(file)
+
+  def original_file_name(self, file, check_existence = True):
+    """Returns the original file name of the given file, see :py:meth:`bob.db.verification.filelist.Database.original_file_name`; the original directory is shared by all base directories."""
+    return self.__database__(0).original_file_name(file, check_existence)
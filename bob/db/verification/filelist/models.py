@@ -22,8 +22,10 @@ This file defines simple Client and File interfaces that are comparable with oth
 """
 
 import os
-import fileinput
 import re
+import collections
+import hashlib
+import threading
 
 import bob.db.verification.utils
 
@@ -55,45 +57,171 @@ class File (bob.db.verification.utils.File):
     self.claimed_id = client_id if claimed_id is None else claimed_id
 
 
+class FileList (list):
+  """A :py:class:`list` of :py:class:`File` objects, as returned by the database queries.
+
+  Lists of files are pickled in a compact columnar format, see :py:mod:`bob.db.verification.filelist.columnar`.
+  Lists that were modified to contain other objects are pickled as usual lists; the columnar format is decoded completely when the list is unpickled.
+  """
+  def __reduce_ex__(self, protocol):
+    # the columnar format stores only the attributes of File objects
+    if not all(type(file) is File for file in self):
+      return list.__reduce_ex__(self, protocol)
+    from .columnar import encode_files, _file_list
+    return (_file_list, (encode_files(self),))
+
+
 
 #############################################################################
 ### internal access functions for the file lists; do not export!
 #############################################################################
 
+# the entries of a line in a list file
+_ROW = re.compile(r'[\w/(-.)]+')
+
+
+def _signature(stat):
+  """The size and modification time of a list file, which are used to detect changes."""
+  return (stat.st_size, getattr(stat, 'st_mtime_ns', stat.st_mtime))
+
+
+def _prefix_digest(list_file, length, block_size = 1 << 20):
+  """Computes the checksum of the first ``length`` bytes of the given file."""
+  hash = hashlib.sha1()
+  with open(list_file, 'rb') as f:
+    while length > 0:
+      block = f.read(min(block_size, length))
+      if not block:
+        break
+      hash.update(block)
+      length -= len(block)
+  return hash.digest()
+
+
+class _ListState:
+  """The part of a list file that has been parsed, which allows to parse only lines that are appended later."""
+
+  def __init__(self):
+    # the size and modification time of the list file when it was parsed
+    self.signature = None
+    # the end of the last complete line and the checksum of the file up to there
+    self.offset = 0
+    self.hash = hashlib.sha1()
+    # the number of rows parsed from an incomplete last line, which is parsed again when the file grows
+    self.partial_rows = 0
+    # the first parsed row, which defines the number of columns
+    self.first_row = None
+
+  def update_prefix(self, list_file, size, block_size = 1 << 20):
+    """Sets the parsed prefix to all complete lines in the first ``size`` bytes of the list file."""
+    pending = b''
+    with open(list_file, 'rb') as f:
+      while size > 0:
+        block = f.read(min(block_size, size))
+        if not block:
+          break
+        size -= len(block)
+        data = pending + block
+        cut = data.rfind(b'\n') + 1
+        self.hash.update(data[:cut])
+        self.offset += cut
+        pending = data[cut:]
+    self.partial_rows = 1 if _ROW.findall(pending.decode('utf-8')) else 0
+
+  def copy(self):
+    retval = _ListState()
+    retval.__dict__.update(self.__dict__)
+    retval.hash = self.hash.copy()
+    return retval
+
+
+# the extension of the sidecar files containing the seek indexes
+SEEK_INDEX_EXTENSION = '.idx'
+# the lists, for which seek indexes are created; the training lists have no type
+SEEK_INDEX_TYPES = ('for_models', 'for_scores', 'for_tnorm', None)
+# the size in bytes, from which list files are parsed in parallel
+PARALLEL_THRESHOLD = 256 * 1024 * 1024
+
+
 class ListReader:
 
-  def __init__(self, store_lists):
+  def __init__(self, store_lists, parallel_threshold = PARALLEL_THRESHOLD, parallel_workers = None):
     self.m_read_lists = {}
     self.m_model_dicts = {}
     self.m_store_lists = store_lists
+    # list files of at least this size are parsed in parallel by the given number of processes
+    self.m_parallel_threshold = parallel_threshold
+    self.m_parallel_workers = parallel_workers
+    # changes whenever a cached list is replaced, which invalidates all results derived from the cached lists
+    self.m_generation = 0
+    # lists in the compact format of the columnar module, which are decoded instead of parsing the list files
+    self.m_encoded_lists = {}
+    # the parsed prefixes of the cached lists, which are used to detect and parse appended lines
+    self.m_list_states = {}
+    self.m_list_keys = {}
+    # the seek indexes of the list files, which are used when the lists are not kept in memory
+    self.m_seek_indexes = {}
+    # the Files of each client of the cached lists
+    self.m_client_indexes = {}
+    # the content hashes of the lists: the hash of the complete rows, their number, the digest of the list and the signature of the list file
+    self.m_fingerprints = {}
+    # only one thread at a time reads or updates a list, other threads wait for its result
+    self.m_lock = threading.Lock()
+    self.m_list_locks = {}
 
 
-  def _read_multi_column_list(self, list_file):
+  def _read_multi_column_list(self, list_file, state = None, ranges = None, start = None, end = None):
     rows = []
     if not os.path.isfile(list_file):
       raise RuntimeError('File %s does not exist.' % (list_file,))
+    # when a state is given, parsing starts at the end of its parsed prefix
+    first_row = state.first_row if state is not None else None
     try:
-      for line in fileinput.input(list_file):
-        parsed_line = re.findall('[\w/(-.)]+', line)
-        if len(parsed_line):
-          # perform some sanity checks
-          if len(parsed_line) not in (2,3,4):
-            raise IOError("The read line '%s' from file '%s' could not be parsed successfully!" % (line.rstrip(), list_file))
-          if len(rows) and len(rows[0]) != len(parsed_line):
-            raise IOError("The parsed line '%s' from file '%s' has a different number of elements than the first parsed line '%s'!" % (parsed_line, list_file, rows[0]))
-          # append the read line
-          rows.append(parsed_line)
-      fileinput.close()
+      # fileinput.input() uses a global state, which does not allow to read lists in several threads
+      with open(list_file, 'rb') as lines:
+        if state is not None:
+          state.signature = _signature(os.fstat(lines.fileno()))
+          state.partial_rows = 0
+          lines.seek(state.offset)
+        elif start is not None:
+          # only the lines between start and end are read
+          lines.seek(start)
+        position = lines.tell()
+        for line in lines:
+          if end is not None and position >= end:
+            break
+          parsed_line = _ROW.findall(line.decode('utf-8'))
+          line_start, position = position, position + len(line)
+          if state is not None:
+            if line.endswith(b'\n'):
+              state.offset += len(line)
+              state.hash.update(line)
+            else:
+              # the last line might still be written, so it does not count to the parsed prefix
+              state.partial_rows = 1 if len(parsed_line) else 0
+          if len(parsed_line):
+            if first_row is None:
+              first_row = parsed_line
+            # perform some sanity checks
+            if len(parsed_line) not in (2,3,4):
+              raise IOError("The read line '%s' from file '%s' could not be parsed successfully!" % (line.decode('utf-8').rstrip(), list_file))
+            if len(first_row) != len(parsed_line):
+              raise IOError("The parsed line '%s' from file '%s' has a different number of elements than the first parsed line '%s'!" % (parsed_line, list_file, first_row))
+            # append the read line
+            rows.append(parsed_line)
+            if ranges is not None:
+              # remember the byte range of the line
+              ranges.append((line_start, position))
     except IOError as e:
       raise RuntimeError("Error reading the file '%s' : '%s'." % (list_file, e))
 
+    if state is not None:
+      state.first_row = first_row
     # return the read list as a vector of columns
     return rows
 
 
-  def _read_column_list(self, list_file, column_count):
-    # read the list
-    rows = self._read_multi_column_list(list_file)
+  def _create_files(self, rows, column_count):
     # extract the file from the first two columns
     file_list = []
     for row in rows:
@@ -115,9 +243,60 @@ class ListReader:
     return file_list
 
 
-  def _create_model_dictionary(self, files):
-    # remember model ids
-    retval = {}
+  def _read_column_list(self, list_file, column_count, state = None):
+    # large lists are parsed in several processes, unless only appended lines need to be parsed
+    if self.m_parallel_threshold and (state is None or state.offset == 0) and os.path.isfile(list_file) and os.path.getsize(list_file) >= self.m_parallel_threshold:
+      return self._read_column_list_parallel(list_file, column_count, state)
+    # read the list
+    return self._create_files(self._read_multi_column_list(list_file, state), column_count)
+
+
+  def _read_column_list_parallel(self, list_file, column_count, state = None):
+    """Parses newline-aligned byte ranges of the given list file in a process pool, and concatenates the results."""
+    import concurrent.futures
+    from .columnar import decode_files
+    workers = self.m_parallel_workers or os.cpu_count() or 1
+    with open(list_file, 'rb') as f:
+      stat = os.fstat(f.fileno())
+      size = stat.st_size
+      # several ranges per worker balance the load
+      chunks = workers * 4
+      bounds = [0]
+      for i in range(1, chunks):
+        f.seek(max(size * i // chunks, bounds[-1]))
+        f.readline()
+        if f.tell() >= size:
+          break
+        bounds.append(f.tell())
+      bounds.append(size)
+
+    with concurrent.futures.ProcessPoolExecutor(workers) as pool:
+      futures = [pool.submit(_parse_range, list_file, column_count, start, end) for start, end in zip(bounds[:-1], bounds[1:])]
+      if state is not None:
+        # the parsed prefix is computed while the workers parse
+        state.signature = _signature(stat)
+        state.update_prefix(list_file, size)
+      results = [future.result() for future in futures]
+
+    # the number of columns must be consistent across the ranges
+    files = []
+    first_row = None
+    for row, buffer in results:
+      if row is None:
+        continue
+      if first_row is None:
+        first_row = row
+      elif len(row) != len(first_row):
+        raise RuntimeError("Error reading the file '%s' : '%s'." % (list_file, "The parsed line '%s' from file '%s' has a different number of elements than the first parsed line '%s'!" % (row, list_file, first_row)))
+      files.extend(decode_files(buffer))
+    if state is not None:
+      state.first_row = first_row
+    return files
+
+
+  def _create_model_dictionary(self, files, retval = None):
+    # remember model ids, possibly adding to the given dictionary
+    retval = {} if retval is None else retval
     for file in files:
       if file._model_id not in retval:
         retval[file._model_id] = file.client_id
@@ -126,45 +305,507 @@ class ListReader:
           raise ValueError("The read model id '%s' is associated to two different client ids '%s' and '%s'!" % (file._model_id, file.client_id, retval[file._model_id]))
     return retval
 
+  def _create_client_index(self, files, retval = None):
+    # collects the files of each client, possibly adding to the given index without modifying its lists
+    retval = collections.OrderedDict() if retval is None else retval
+    appended = collections.OrderedDict()
+    for file in files:
+      appended.setdefault(file.client_id, []).append(file)
+    for client_id, client_files in appended.items():
+      retval[client_id] = retval[client_id] + client_files if client_id in retval else client_files
+    return retval
 
-  def read_list(self, list_file, group, type = None):
-    """Reads the list of Files from the given list file (if not done yet) and returns it."""
+
+  def __getstate__(self):
+    # the cached lists are pickled in the columnar format, and decoded when they are used for the first time
+    from .columnar import encode_files
+    state = self.__dict__.copy()
+    encoded = dict((list_file, bytes(buffer)) for list_file, buffer in self.m_encoded_lists.items())
+    for list_file, list in self.m_read_lists.items():
+      if list_file not in encoded:
+        encoded[list_file] = encode_files(list)
+    state['m_encoded_lists'] = encoded
+    state['m_read_lists'] = {}
+    # lists restored from the pickled state are not compared to the list files
+    state['m_list_states'] = {}
+    state['m_list_keys'] = {}
+    state['m_client_indexes'] = {}
+    state['m_fingerprints'] = {}
+    del state['m_lock']
+    del state['m_list_locks']
+    return state
+
+  def __setstate__(self, state):
+    self.__dict__.update(state)
+    self.m_lock = threading.Lock()
+    self.m_list_locks = {}
+
+
+  def _list_lock(self, list_file):
+    """Returns the lock of the given list file, which is held while the list is read or updated."""
+    lock = self.m_list_locks.get(list_file)
+    if lock is None:
+      with self.m_lock:
+        # reentrant, since reading a list might require to read it again, e.g., to create the model dictionary
+        lock = self.m_list_locks.setdefault(list_file, threading.RLock())
+    return lock
+
+  def _is_current(self, list_file):
+    """Checks, without locking, whether the cached data of the given list can be used without updating the list."""
+    state = self.m_list_states.get(list_file)
+    if state is None:
+      return True
+    try:
+      return _signature(os.stat(list_file)) == state.signature
+    except OSError:
+      return False
+
+
+  def clear(self):
+    """Removes all cached lists and model dictionaries."""
+    with self.m_lock:
+      self.m_read_lists.clear()
+      self.m_model_dicts.clear()
+      self.m_list_states.clear()
+      self.m_list_keys.clear()
+      self.m_seek_indexes.clear()
+      self.m_client_indexes.clear()
+      self.m_fingerprints.clear()
+      self.m_generation += 1
+
+
+  def _column_count(self, group, type):
+    """Returns the number of columns that the list of the given group and type is expected to have."""
     if group in ('world', 'optional_world_1', 'optional_world_2'):
-      if group not in self.m_read_lists:
-        # read the world list into memory
-        list = self._read_column_list(list_file, 2)
-        if self.m_store_lists:
-          self.m_read_lists[group] = list
-        return list
-      # just return the previously read list
-      return self.m_read_lists[group]
-
-    else:
-      if group not in self.m_read_lists:
-        self.m_read_lists[group] = {}
-      if type not in self.m_read_lists[group]:
-        if type in ('for_models', 'for_tnorm'):
-          list = self._read_column_list(list_file, 3)
-        elif type == 'for_scores':
-          list = self._read_column_list(list_file, 4)
-        elif type in ('for_probes', 'for_znorm'):
-          list = self._read_column_list(list_file, 2)
-        else:
-          raise ValueError("The given type must be one of %s, but not '%s'" %(('for_models', 'for_scores', 'for_probes', 'for_tnorm', 'for_znorm'), type))
-        if self.m_store_lists:
-          self.m_read_lists[group][type] = list
+      return 2
+    if type in ('for_models', 'for_tnorm'):
+      return 3
+    if type == 'for_scores':
+      return 4
+    if type in ('for_probes', 'for_znorm'):
+      return 2
+    raise ValueError("The given type must be one of %s, but not '%s'" %(('for_models', 'for_scores', 'for_probes', 'for_tnorm', 'for_znorm'), type))
+
+
+  def refresh(self, list_files = None):
+    """Updates the cached lists, whose list files have changed since they were parsed.
+
+    Cached lists, whose list files do not exist any more, are removed from the cache.
+
+    Keyword parameters:
+
+    list_files : [str] or ``None``
+      The list files to check; if ``None``, all cached lists are checked
+
+    Returns: ``True`` if any of the lists has been updated or removed
+    """
+    generation = self.m_generation
+    if list_files is None:
+      list_files = list(self.m_list_keys)
+    for list_file in list_files:
+      key = self.m_list_keys.get(list_file)
+      if key is None:
+        continue
+      try:
+        self._update_list(list_file, *key)
+      except RuntimeError:
+        if os.path.isfile(list_file):
+          raise
+        self._evict_list(list_file)
+    return self.m_generation != generation
+
+
+  def _evict_list(self, list_file):
+    """Removes the cached data of the given list, e.g., after the list file has been deleted."""
+    with self._list_lock(list_file):
+      for cache in (self.m_read_lists, self.m_model_dicts, self.m_list_states, self.m_list_keys, self.m_seek_indexes, self.m_client_indexes, self.m_fingerprints):
+        cache.pop(list_file, None)
+      with self.m_lock:
+        self.m_generation += 1
+
+
+  def _update_list(self, list_file, group, type):
+    """Updates the cached list when the list file has changed since it was parsed."""
+    # unchanged lists are detected without locking, so that threads that share warm lists do not wait for each other
+    if self._is_current(list_file):
+      return
+    with self._list_lock(list_file):
+      state = self.m_list_states[list_file]
+      try:
+        signature = _signature(os.stat(list_file))
+      except OSError:
+        raise RuntimeError('File %s does not exist.' % (list_file,))
+      if signature == state.signature:
+        return
+
+      column_count = self._column_count(group, type)
+      files = self.m_read_lists[list_file]
+      model_dict = self.m_model_dicts.get(list_file)
+      client_index = self.m_client_indexes.get(list_file)
+      if signature[0] >= state.offset and _prefix_digest(list_file, state.offset) == state.hash.digest():
+        # the file has only grown; parse the appended lines (and the previously incomplete last line)
+        new_state = state.copy()
+        new_files = self._read_column_list(list_file, column_count, new_state)
+        files = files[:len(files) - state.partial_rows] + new_files
+        if list_file in self.m_fingerprints:
+          # the hash of the complete rows is still valid, but the digest of the list is not
+          self.m_fingerprints[list_file][2] = None
+        if model_dict is not None:
+          model_dict = None if state.partial_rows else self._create_model_dictionary(new_files, model_dict.copy())
+        if client_index is not None:
+          client_index = None if state.partial_rows else self._create_client_index(new_files, client_index.copy())
+      else:
+        # the file has been modified; parse it again
+        new_state = _ListState()
+        files = self._read_column_list(list_file, column_count, new_state)
+        model_dict = None
+        client_index = None
+        self.m_fingerprints.pop(list_file, None)
+
+      self.m_read_lists[list_file] = files
+      if model_dict is None:
+        self.m_model_dicts.pop(list_file, None)
+      else:
+        self.m_model_dicts[list_file] = model_dict
+      if client_index is None:
+        self.m_client_indexes.pop(list_file, None)
+      else:
+        self.m_client_indexes[list_file] = client_index
+      # the new state is set last, so that threads that do not lock see the updated data before they consider it current
+      self.m_list_states[list_file] = new_state
+      with self.m_lock:
+        self.m_generation += 1
+
+
+  def read_list(self, list_file, group, type = None):
+    """Reads the list of Files from the given list file (if not done yet) and returns it.
+
+    Cached lists are checked for changes of the list file; when lines were appended to the file, only these lines are parsed.
+    """
+    # warm lists are returned without locking
+    list = self.m_read_lists.get(list_file)
+    if list is not None and self._is_current(list_file):
+      return list
+    if not self.m_store_lists and list_file not in self.m_encoded_lists:
+      return self._read_column_list(list_file, self._column_count(group, type))
+    with self._list_lock(list_file):
+      return self._read_list(list_file, group, type)
+
+  def _read_list(self, list_file, group, type):
+    # lists are cached by their file name, so that several protocols can share the same reader
+    if list_file not in self.m_read_lists:
+      state = None
+      if list_file in self.m_encoded_lists:
+        from .columnar import decode_files
+        list = decode_files(self.m_encoded_lists[list_file])
+      else:
+        state = _ListState()
+        list = self._read_column_list(list_file, self._column_count(group, type), state)
+      if not self.m_store_lists:
         return list
-      return self.m_read_lists[group][type]
+      self.m_read_lists[list_file] = list
+      # lists that are not read from the list file (e.g., from SQL or shared memory) are not updated
+      if state is not None and state.signature is not None:
+        self.m_list_states[list_file] = state
+        self.m_list_keys[list_file] = (group, type)
+    elif list_file in self.m_list_states:
+      self._update_list(list_file, group, type)
+    # just return the previously read list
+    return self.m_read_lists[list_file]
 
   def read_models(self, list_file, group, type= None):
     """Generates a dictionary from model_ids to client_ids for the given list file, if not done yet, and returns it"""
     assert group in ('dev', 'eval', 'world', 'optional_world_1', 'optional_world_2')
     assert type in ('for_models', 'for_tnorm')
-    if group not in self.m_model_dicts:
-      self.m_model_dicts[group] = {}
-    if type not in self.m_model_dicts[group]:
-      dict = self._create_model_dictionary(self.read_list(list_file, group, type))
-      if self.m_store_lists:
-        self.m_model_dicts[group][type] = dict
+    if not self.m_store_lists and list_file not in self.m_encoded_lists:
+      # the seek index contains the model dictionary, unless the list is invalid
+      clients = self._seek_index(list_file, group, type)['clients']
+      if clients is not None:
+        return clients.copy()
+    dict = self.m_model_dicts.get(list_file)
+    if dict is not None and self._is_current(list_file):
       return dict
-    return self.m_model_dicts[group][type]
+    with self._list_lock(list_file):
+      if list_file in self.m_list_states:
+        # update the list (and the dictionary) in case the list file has changed
+        self._update_list(list_file, group, type)
+      if list_file not in self.m_model_dicts:
+        dict = self._create_model_dictionary(self.read_list(list_file, group, type))
+        if not self.m_store_lists:
+          return dict
+        self.m_model_dicts[list_file] = dict
+      return self.m_model_dicts[list_file]
+
+  def read_list_for_models(self, list_file, group, type, model_ids):
+    """Returns the Files from the given list file that belong to one of the given model ids."""
+    if not self.m_store_lists and type in SEEK_INDEX_TYPES and list_file not in self.m_encoded_lists:
+      # read only the lines of the given models
+      index = self._seek_index(list_file, group, type)['models']
+      ranges = []
+      for model_id in set(model_ids):
+        positions = index.get(model_id, ())
+        ranges.extend(zip(positions[0::2], positions[1::2]))
+      ranges.sort()
+      return self._read_ranges(list_file, self._column_count(group, type), ranges)
+    return [file for file in self.read_list(list_file, group, type) if file._model_id in model_ids]
+
+
+  def iter_model_files(self, list_file, group, type):
+    """Yields tuples ``(model_id, files)`` with all Files of each model of the given list file, in the order of the first appearance of the models.
+
+    Other than the database queries, files that appear several times are kept.
+    When the lists are not stored, the lines of one model at a time are read using the seek index.
+    """
+    if not self.m_store_lists and type in SEEK_INDEX_TYPES and list_file not in self.m_encoded_lists:
+      column_count = self._column_count(group, type)
+      with open(list_file, 'rb') as f:
+        for model_id, positions in self._seek_index(list_file, group, type)['models'].items():
+          yield model_id, self._create_files(_range_rows(f, zip(positions[0::2], positions[1::2])), column_count)
+      return
+    models = collections.OrderedDict()
+    for file in self.read_list(list_file, group, type):
+      models.setdefault(file._model_id, []).append(file)
+    for item in models.items():
+      yield item
+
+
+  def _seek_index(self, list_file, group, type):
+    """Returns the seek index of the given list file, which is read from or written to the sidecar file next to the list file.
+
+    The index is a dictionary containing the ``signature`` of the list file, the start and end positions of the lines of each model in ``models``, and the model dictionary in ``clients``.
+    It is created again when the list file has changed.
+    """
+    try:
+      signature = list(_signature(os.stat(list_file)))
+    except OSError:
+      raise RuntimeError('File %s does not exist.' % (list_file,))
+    index = self.m_seek_indexes.get(list_file)
+    if index is not None and index['signature'] == signature:
+      return index
+    with self._list_lock(list_file):
+      index = self.m_seek_indexes.get(list_file)
+      if index is not None and index['signature'] == signature:
+        return index
+      return self._load_seek_index(list_file, group, type, signature)
+
+  def _load_seek_index(self, list_file, group, type, signature):
+    import json
+    index_file = list_file + SEEK_INDEX_EXTENSION
+    try:
+      with open(index_file) as f:
+        index = json.load(f)
+    except (IOError, ValueError):
+      index = None
+    if index is None or index.get('version') != 1 or index.get('signature') != signature:
+      index = self._create_seek_index(list_file, group, type, signature)
+      # the sidecar file is only an optimization, the list directory might not be writable
+      temp_file = '%s.%d' % (index_file, os.getpid())
+      try:
+        with open(temp_file, 'w') as f:
+          json.dump(index, f)
+        os.replace(temp_file, index_file)
+      except (IOError, OSError):
+        if os.path.exists(temp_file):
+          os.remove(temp_file)
+    self.m_seek_indexes[list_file] = index
+    return index
+
+  def _create_seek_index(self, list_file, group, type, signature):
+    ranges = []
+    files = self._create_files(self._read_multi_column_list(list_file, ranges = ranges), self._column_count(group, type))
+    models = {}
+    for file, (start, end) in zip(files, ranges):
+      # the ranges are stored as a flat list of start and end positions
+      model_ranges = models.setdefault(file._model_id, [])
+      if model_ranges and model_ranges[-1] == start:
+        # merge consecutive lines of the same model
+        model_ranges[-1] = end
+      else:
+        model_ranges.extend((start, end))
+    clients = None
+    if type in ('for_models', 'for_tnorm'):
+      try:
+        clients = self._create_model_dictionary(files)
+      except ValueError:
+        # the error is raised when the model dictionary is read from the list
+        pass
+    return {'version' : 1, 'signature' : signature, 'models' : models, 'clients' : clients}
+
+  def _read_ranges(self, list_file, column_count, ranges):
+    """Reads the Files from the given byte ranges of the list file, which has been checked when creating the seek index."""
+    with open(list_file, 'rb') as f:
+      return self._create_files(_range_rows(f, ranges), column_count)
+
+  def read_fingerprint(self, list_file, group, type = None):
+    """Returns the SHA-1 digest of the parsed content of the given list file.
+
+    The digest depends only on the Files of the list, i.e., not on white space or on the layout of the list file.
+    When lists are stored, the hash is updated with appended lines only; otherwise, it is kept until the list file changes.
+    """
+    if not self.m_store_lists:
+      try:
+        signature = _signature(os.stat(list_file))
+      except OSError:
+        # lists might be read from other sources, which do not change
+        signature = None
+      entry = self.m_fingerprints.get(list_file)
+      if entry is None or entry[3] != signature:
+        hash = hashlib.sha1()
+        _update_fingerprint(hash, self.read_list(list_file, group, type))
+        entry = self.m_fingerprints[list_file] = [None, 0, hash.digest(), signature]
+      return entry[2]
+
+    entry = self.m_fingerprints.get(list_file)
+    if entry is not None and entry[2] is not None and self._is_current(list_file):
+      return entry[2]
+    with self._list_lock(list_file):
+      return self._update_fingerprint(list_file, group, type)
+
+  def _update_fingerprint(self, list_file, group, type):
+    files = self.read_list(list_file, group, type)
+    entry = self.m_fingerprints.get(list_file)
+    if entry is not None and entry[2] is not None:
+      return entry[2]
+    if entry is None:
+      entry = self.m_fingerprints[list_file] = [hashlib.sha1(), 0, None, None]
+    # the rows of an incomplete last line might change, hence they are not added to the stored hash
+    state = self.m_list_states.get(list_file)
+    complete = len(files) - (state.partial_rows if state is not None else 0)
+    _update_fingerprint(entry[0], files[entry[1]:complete])
+    entry[1] = complete
+    hash = entry[0].copy()
+    _update_fingerprint(hash, files[complete:])
+    entry[2] = hash.digest()
+    return entry[2]
+
+  def read_client_index(self, list_file, group, type = None, client_ids = None):
+    """Returns a dictionary from the client ids to the Files of each client in the given list file, in the order of the first appearance of the clients.
+
+    When lists are stored, the index is created only once and updated with the list; it must not be modified.
+    When client ids are given, only these clients are returned; if the lists are not stored, only the lines of these clients are read from the training lists, using the seek index.
+    """
+    if client_ids is not None:
+      if not self.m_store_lists and group in ('world', 'optional_world_1', 'optional_world_2') and list_file not in self.m_encoded_lists:
+        # in the training lists, the model ids are the client ids
+        return self._create_client_index(self.read_list_for_models(list_file, group, None, client_ids))
+      index = self.read_client_index(list_file, group, type)
+      return collections.OrderedDict((client_id, index[client_id]) for client_id in client_ids if client_id in index)
+    index = self.m_client_indexes.get(list_file)
+    if index is not None and self._is_current(list_file):
+      return index
+    with self._list_lock(list_file):
+      if list_file in self.m_list_states:
+        self._update_list(list_file, group, type)
+      if list_file not in self.m_client_indexes:
+        index = self._create_client_index(self.read_list(list_file, group, type))
+        if not self.m_store_lists:
+          return index
+        self.m_client_indexes[list_file] = index
+      return self.m_client_indexes[list_file]
+
+  def read_client_ids(self, list_file, group, type = None):
+    """Returns the set of client ids contained in the given list file."""
+    if self.m_store_lists:
+      return set(self.read_client_index(list_file, group, type))
+    if list_file not in self.m_encoded_lists:
+      # the seek index knows the clients of the training lists and of the model lists
+      if group in ('world', 'optional_world_1', 'optional_world_2'):
+        return set(self._seek_index(list_file, group, None)['models'])
+      if type in ('for_models', 'for_tnorm'):
+        clients = self._seek_index(list_file, group, type)['clients']
+        if clients is not None:
+          return set(clients.values())
+    return set(file.client_id for file in self.read_list(list_file, group, type))
+
+
+def _update_fingerprint(hash, files, block_size = 65536):
+  """Adds the normalized rows of the given Files to the given hash."""
+  for start in range(0, len(files), block_size):
+    hash.update(''.join('%s %s %s %s\n' % (file.path, file.client_id, file._model_id, file.claimed_id) for file in files[start : start + block_size]).encode('utf-8'))
+
+
+def _range_rows(f, ranges):
+  """Parses the lines between the given start and end positions of the opened list file."""
+  rows = []
+  for start, end in ranges:
+    f.seek(start)
+    for line in f.read(end - start).split(b'\n'):
+      parsed_line = _ROW.findall(line.decode('utf-8'))
+      if parsed_line:
+        rows.append(parsed_line)
+  return rows
+
+
+def _parse_range(list_file, column_count, start, end):
+  """Parses the lines between the given positions of the list file in a worker process.
+
+  Returns: the first parsed row, and the Files in the format of :py:mod:`bob.db.verification.filelist.columnar`
+  """
+  from .columnar import encode_files
+  reader = ListReader(False)
+  rows = reader._read_multi_column_list(list_file, start = start, end = end)
+  return (rows[0] if rows else None), encode_files(reader._create_files(rows, column_count))
+
+
+QueryCacheInfo = collections.namedtuple('QueryCacheInfo', ('hits', 'misses', 'maxsize', 'currsize'))
+
+class QueryCache:
+  """A least-recently-used cache for the results of database queries.
+
+  Each entry remembers the generation of the :py:class:`ListReader` it was computed from.
+  Whenever the reader replaces one of its cached lists, the generation changes and all older entries are recomputed.
+  A ``maxsize`` of 0 disables the cache.
+  The cache can be used by several threads; results are computed without holding the lock, and cached results are returned without waiting for the lock.
+  """
+
+  def __init__(self, maxsize):
+    self.m_entries = collections.OrderedDict()
+    self.m_maxsize = maxsize
+    self.m_hits = 0
+    self.m_misses = 0
+    self.m_lock = threading.Lock()
+
+  def __getstate__(self):
+    # the cached results are not pickled
+    return {'m_maxsize' : self.m_maxsize}
+
+  def __setstate__(self, state):
+    self.__init__(state['m_maxsize'])
+
+  def get(self, key, generation, compute):
+    """Returns the cached result for the given key, or computes, stores and returns it."""
+    if self.m_maxsize <= 0:
+      return compute()
+    entry = self.m_entries.get(key)
+    if entry is not None and entry[0] == generation:
+      self.m_hits += 1
+      # the entry is marked as recently used only if no other thread holds the lock, so that hits never wait
+      if self.m_lock.acquire(False):
+        try:
+          # OrderedDict.move_to_end() requires Python 3.2
+          if key in self.m_entries:
+            self.m_entries[key] = self.m_entries.pop(key)
+        finally:
+          self.m_lock.release()
+      return entry[1]
+    with self.m_lock:
+      self.m_misses += 1
+    result = compute()
+    with self.m_lock:
+      self.m_entries.pop(key, None)
+      self.m_entries[key] = (generation, result)
+      while len(self.m_entries) > self.m_maxsize:
+        # remove the least recently used entry
+        self.m_entries.popitem(last = False)
+    return result
+
+  def clear(self):
+    """Removes all entries and resets the statistics."""
+    with self.m_lock:
+      self.m_entries.clear()
+      self.m_hits = self.m_misses = 0
+
+  def info(self):
+    """Returns the number of hits and misses, the maximum and the current size of the cache."""
+    with self.m_lock:
+      return QueryCacheInfo(self.m_hits, self.m_misses, self.m_maxsize, len(self.m_entries))
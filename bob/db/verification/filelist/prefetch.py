@@ -0,0 +1,63 @@
+#!/usr/bin/env python
+# vim: set fileencoding=utf-8 :
+#
+# Copyright (C) 2011-2013 Idiap Research Institute, Martigny, Switzerland
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, version 3 of the License.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""Reading of the original data files ahead of their use, see :py:meth:`bob.db.verification.filelist.Database.prefetch`.
+
+The original file names are resolved and the files are loaded in a pool of threads, which keeps a limited number of files ahead of the consumer.
+Threads are sufficient, since the time is mostly spent waiting for the (network) storage.
+"""
+
+import collections
+import concurrent.futures
+import itertools
+
+
+def _load(database, file, loader, annotations):
+  """Resolves the original file name of the given file and loads its data and, if requested, its annotations."""
+  data = loader(database.original_file_name(file))
+  return file, data, database.annotations(file) if annotations else None
+
+
+def prefetch(database, files, loader = None, read_ahead = 16, workers = 4, annotations = False):
+  """Loads the original data of the given files in a thread pool and yields ``(file, data, annotations)`` in the order of the files.
+
+  At most ``read_ahead`` files are loaded before they are consumed.
+  Exceptions raised when loading a file are raised when the file is reached.
+  Files that are not consumed yet are not loaded anymore when the generator is closed.
+  """
+  if read_ahead < 1 or workers < 1:
+    raise ValueError("The read-ahead depth and the number of workers must be positive, not %d and %d" % (read_ahead, workers))
+  if loader is None:
+    import bob.io.base
+    loader = bob.io.base.load
+
+  files = iter(files)
+  pending = collections.deque()
+  executor = concurrent.futures.ThreadPoolExecutor(min(workers, read_ahead))
+  try:
+    for file in itertools.islice(files, read_ahead):
+      pending.append(executor.submit(_load, database, file, loader, annotations))
+    while pending:
+      future = pending.popleft()
+      # keep the pool busy while the current file is consumed
+      for file in itertools.islice(files, 1):
+        pending.append(executor.submit(_load, database, file, loader, annotations))
+      yield future.result()
+  finally:
+    for future in pending:
+      future.cancel()
+    executor.shutdown(wait = True)
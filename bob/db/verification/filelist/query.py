@@ -22,12 +22,26 @@ verification database based on file lists in the most obvious ways.
 """
 
 import os
-import six
+import collections
 
-from .models import Client, File, ListReader
+from .models import Client, File, FileList, ListReader, QueryCache, PARALLEL_THRESHOLD
 
 import bob.db.verification.utils
 
+try:
+  string_types = basestring
+except NameError:
+  string_types = str
+
+def _make_paths(files, directory, extension):
+  """Returns ``os.path.join(directory, file.path + extension)`` for all files, joining the directory only once."""
+  if directory is None: directory = '.'
+  if extension is None: extension = ''
+  prefix = os.path.join(directory, '')
+  # absolute paths replace the directory, as in os.path.join
+  return [(path if path.startswith('/') else prefix + path) + extension for path in (file.path for file in files)]
+
+
 class Database(bob.db.verification.utils.ZTDatabase):
   """This class provides a user-friendly interface to databases that are given as file lists.
   The API is comparable to other bob.db verification databases by implementing the :py:class:`bob.db.verification.utils.ZTDatabase` interface.
@@ -93,7 +107,31 @@ class Database(bob.db.verification.utils.ZTDatabase):
     If ``None`` it is tried to be estimated based on the given parameters.
 
   keep_read_lists_in_memory : bool
-    If set to true, the lists are read only once and stored in memory
+    If set to true, the lists are read only once and stored in memory.
+    Otherwise, queries for given model ids read only the lines of these models, using a seek index that is stored next to the list file (with the additional extension ``.idx``).
+
+  query_cache_size : int
+    The number of results of :py:meth:`objects`, :py:meth:`tobjects` and :py:meth:`zobjects` queries that are kept in memory.
+    The least recently used results are discarded first.
+    Results are only cached when ``keep_read_lists_in_memory`` is enabled; set to 0 to disable the cache.
+
+  shared_list_store : str or :py:class:`bob.db.verification.filelist.shared.SharedListStore` or ``None``
+    The name of a shared memory segment created by :py:class:`bob.db.verification.filelist.shared.SharedListStore`.
+    Lists contained in the store are read from shared memory instead of from the list files.
+
+  sqlite_file : str or ``None``
+    An SQLite file generated by :py:func:`bob.db.verification.filelist.sql.compile_lists`.
+    If given, the queries are answered using the indexed SQLite file instead of parsing the list files.
+
+  query_server : str or ``None``
+    The Unix domain socket of a query daemon started with :py:func:`bob.db.verification.filelist.server.serve`.
+    If given, the :py:meth:`objects`, :py:meth:`tobjects`, :py:meth:`zobjects`, :py:meth:`model_ids` and :py:meth:`client_ids` queries are forwarded to the daemon.
+
+  parallel_parsing_threshold : int or ``None``
+    List files of at least this size (in bytes) are split into parts, which are parsed in parallel processes; set to ``None`` to always parse in the current process.
+
+  parallel_parsing_workers : int or ``None``
+    The number of processes that parse large list files; by default, one process per CPU is used.
   """
 
   def __init__(
@@ -121,7 +159,13 @@ class Database(bob.db.verification.utils.ZTDatabase):
       tnorm_filename = None,
       znorm_filename = None,
       use_dense_probe_file_list = None,   # if both probe_filename and scores_filename is given, what kind of list should be used?
-      keep_read_lists_in_memory = True    # if set to True (the RECOMMENDED default) lists are read only once and stored in memory.
+      keep_read_lists_in_memory = True,   # if set to True (the RECOMMENDED default) lists are read only once and stored in memory.
+      query_cache_size = 128,             # the number of query results to remember; only used when keep_read_lists_in_memory is enabled
+      shared_list_store = None,           # the name of a shared memory segment, from which lists are read
+      sqlite_file = None,                 # an SQLite file compiled from the file lists, which is used to answer the queries
+      query_server = None,                # the socket of a query daemon, to which queries are forwarded
+      parallel_parsing_threshold = PARALLEL_THRESHOLD, # the size of list files (in bytes) that are parsed in several processes
+      parallel_parsing_workers = None     # the number of processes to parse large list files
   ):
     """Initializes the database with the file lists from the given base directory,
     and the given sub-directories and file names (which default to useful values if not given)."""
@@ -157,6 +201,11 @@ class Database(bob.db.verification.utils.ZTDatabase):
     # Z-Norm files       format:   filename client_id
     self.m_znorm_filename = znorm_filename if znorm_filename is not None else 'for_znorm.lst'
 
+    self.m_query_client = None
+    if query_server is not None:
+      from .server import QueryClient
+      self.m_query_client = QueryClient(query_server)
+
     # decide, which scoring type we have:
     if probes_filename is not None and scores_filename is None:
       self.m_use_dense_probes = True
@@ -164,6 +213,9 @@ class Database(bob.db.verification.utils.ZTDatabase):
       self.m_use_dense_probes = False
     elif use_dense_probe_file_list is not None:
       self.m_use_dense_probes = use_dense_probe_file_list
+    # Then ask the query daemon
+    elif self.m_query_client is not None:
+      self.m_use_dense_probes = self.m_query_client.query('info')['use_dense_probes']
     # Then direct path to a given protocol
     elif os.path.isdir(os.path.join(self.get_base_directory(), self.m_dev_subdir)) or os.path.isfile(os.path.join(self.get_base_directory(), self.m_world_filename)):
       if os.path.exists(self.get_list_file('dev', 'for_probes')) and not os.path.exists(self.get_list_file('dev', 'for_scores')):
@@ -192,7 +244,86 @@ class Database(bob.db.verification.utils.ZTDatabase):
       else:
         raise ValueError("Unable to determine, which way of probing should be used, since this is not consistent accross protocols. Please specify.")
 
-    self.m_list_reader = ListReader(keep_read_lists_in_memory)
+    if sqlite_file is not None:
+      from .sql import SQLListReader
+      self.m_list_reader = SQLListReader(sqlite_file, self.m_base_dir, keep_read_lists_in_memory, parallel_parsing_threshold, parallel_parsing_workers)
+    else:
+      self.m_list_reader = ListReader(keep_read_lists_in_memory, parallel_parsing_threshold, parallel_parsing_workers)
+    self.m_query_cache = QueryCache(query_cache_size if keep_read_lists_in_memory else 0)
+
+    # the lists that are currently read by the asyncio interface
+    self.m_pending_lists = {}
+    # the content of the manifest file of the protocol catalog, once it is read
+    self.m_protocol_manifest = None
+
+    self.m_shared_list_store = shared_list_store
+    if shared_list_store is not None:
+      if isinstance(shared_list_store, str):
+        from .shared import SharedListStore
+        self.m_shared_list_store = SharedListStore.attach(shared_list_store)
+      self.m_list_reader.m_encoded_lists.update(self.m_shared_list_store.lists())
+
+
+  def query_cache_info(self):
+    """Returns statistics about the cache of query results.
+
+    Returns: a named tuple ``(hits, misses, maxsize, currsize)``
+    """
+    return self.m_query_cache.info()
+
+
+  def __refresh__(self, protocol, groups):
+    # lines appended to the list files invalidate the cached results; only the lists of the query are checked
+    self.m_list_reader.refresh([list_file for group, type, list_file in self.__list_files__(protocol, groups)])
+
+
+  def __cached_query__(self, key, compute, protocol, groups):
+    self.__refresh__(protocol, groups)
+    # returns a copy, so that the caller might modify the returned list
+    return FileList(self.m_query_cache.get(key, self.m_list_reader.m_generation, compute))
+
+
+  def __forward__(self, method, **kwargs):
+    # sends the query to the query daemon; iterable parameters are sent as lists
+    for key, value in kwargs.items():
+      if value is not None and not isinstance(value, string_types):
+        kwargs[key] = list(value)
+    return self.m_query_client.query(method, **kwargs)
+
+
+  def __getstate__(self):
+    # the list reader pickles the lists in a compact format; query results and shared memory are not pickled
+    state = self.__dict__.copy()
+    state['m_query_cache'] = QueryCache(self.m_query_cache.m_maxsize)
+    state['m_shared_list_store'] = None
+    state['m_pending_lists'] = {}
+    return state
+
+
+  def protocols(self):
+    """Returns the names of the protocols, i.e., of the sub-directories of the base directory that contain file lists.
+
+    Returns: a sorted list of protocol names
+    """
+    from .catalog import protocol_names
+    return protocol_names(self)
+
+
+  def protocol_catalog(self, protocols=None):
+    """Describes the given protocols with their groups, probe mode, ZT availability and the numbers of lines, models and clients.
+
+    The descriptions are stored in a manifest file in the base directory, and they are computed again only when the list files of a protocol change.
+    See :py:func:`bob.db.verification.filelist.catalog.protocol_catalog` for details.
+
+    Keyword Parameters:
+
+    protocols : str or [str] or ``None``
+      The protocols to describe; by default, all :py:meth:`protocols` are described
+
+    Returns: a dictionary from protocol names to their descriptions
+    """
+    from .catalog import protocol_catalog
+    return protocol_catalog(self, protocols)
 
 
   def groups(self, protocol=None):
@@ -287,6 +418,36 @@ class Database(bob.db.verification.utils.ZTDatabase):
       return os.path.join(base_directory, group_dir, list_name)
 
 
+  def list_files(self, protocol=None, groups=None):
+    """Returns the file lists of the given protocol that exist on disk.
+
+    Keyword Parameters:
+
+    protocol : str or ``None``
+      The protocol to consider
+
+    groups : str or [str] or ``None``
+      The groups to consider ("dev", "eval", "world", "optional_world_1", "optional_world_2").
+
+    Returns: A list of tuples ``(group, type, list_file)``, where the ``type`` is ``None`` for the training groups.
+    """
+    groups = self.check_parameters_for_validity(groups, "group", ('dev', 'eval', 'world', 'optional_world_1', 'optional_world_2'))
+    return [l for l in self.__list_files__(protocol, groups) if os.path.isfile(l[2])]
+
+
+  def __list_files__(self, protocol, groups):
+    # the possible list files of the given protocol and groups, without checking whether they exist
+    retval = []
+    for group in ('world', 'optional_world_1', 'optional_world_2'):
+      if group in groups:
+        retval.append((group, None, self.get_list_file(group, protocol=protocol)))
+    for group in ('dev', 'eval'):
+      if group in groups:
+        for type in ('for_models', 'for_probes', 'for_scores', 'for_tnorm', 'for_znorm'):
+          retval.append((group, type, self.get_list_file(group, type, protocol)))
+    return retval
+
+
   def get_client_id_from_model_id(self, model_id, groups=None, protocol=None):
     """Returns the client id that is connected to the given model id.
 
@@ -398,9 +559,7 @@ class Database(bob.db.verification.utils.ZTDatabase):
     ids = set()
     # read all lists for all groups and extract the model ids
     for group in groups:
-      files = self.m_list_reader.read_list(self.get_list_file(group, type, protocol), group, type)
-      for file in files:
-        ids.add(file.client_id)
+      ids.update(self.m_list_reader.read_client_ids(self.get_list_file(group, type, protocol), group, type))
     return ids
 
 
@@ -418,6 +577,9 @@ class Database(bob.db.verification.utils.ZTDatabase):
     Returns: A list containing all the client ids which have the given properties.
     """
 
+    if self.m_query_client is not None:
+      return self.__forward__('client_ids', protocol=protocol, groups=groups)
+
     groups = self.check_parameters_for_validity(groups, "group", ('dev', 'eval', 'world', 'optional_world_1', 'optional_world_2'), default_parameters=('dev', 'eval', 'world'))
 
     return self.__client_id_list__(groups, 'for_models', protocol)
@@ -485,6 +647,9 @@ class Database(bob.db.verification.utils.ZTDatabase):
     Returns: A list containing all the model ids which have the given properties.
     """
 
+    if self.m_query_client is not None:
+      return self.__forward__('model_ids', protocol=protocol, groups=groups)
+
     groups = self.check_parameters_for_validity(groups, "group", ('dev', 'eval', 'world', 'optional_world_1', 'optional_world_2'), default_parameters=('dev', 'eval', 'world'))
 
     return self.__model_id_list__(groups, 'for_models', protocol)
@@ -542,6 +707,15 @@ class Database(bob.db.verification.utils.ZTDatabase):
     Returns: A list of :py:class:`File` objects considering all the filtering criteria.
     """
 
+    if self.m_query_client is not None:
+      return self.__forward__('objects', protocol=protocol, purposes=purposes, model_ids=model_ids, groups=groups, classes=classes)
+
+    key, parameters = self.__objects_query__(protocol, purposes, model_ids, groups, classes)
+    return self.__cached_query__(key, lambda: self.__objects__(*parameters), protocol, parameters[3])
+
+
+  def __objects_query__(self, protocol, purposes, model_ids, groups, classes):
+    # checks the parameters of objects() and returns the cache key and the checked parameters
     if self.m_use_dense_probes and classes is not None:
       raise ValueError("To be able to use the 'classes' keyword, please use the 'for_scores.lst' list file.")
 
@@ -549,27 +723,41 @@ class Database(bob.db.verification.utils.ZTDatabase):
     groups = self.check_parameters_for_validity(groups, "group", ('dev', 'eval', 'world', 'optional_world_1', 'optional_world_2'), default_parameters=('dev', 'eval', 'world'))
     classes = self.check_parameters_for_validity(classes, "class", ('client', 'impostor'))
 
-    if isinstance(model_ids, six.string_types): model_ids = (model_ids,)
+    if isinstance(model_ids, string_types): model_ids = (model_ids,)
+    if model_ids is not None: model_ids = tuple(sorted(set(model_ids)))
+
+    # the order of the given parameters does not influence the result
+    key = ('objects', protocol, tuple(sorted(set(purposes))), tuple(sorted(set(groups))), tuple(sorted(set(classes))), model_ids)
+    return key, (protocol, purposes, model_ids, groups, classes)
+
+
+  def __objects__(self, protocol, purposes, model_ids, groups, classes):
+    # when model ids are given, only the files of these models are read
+    def read(group, type = None):
+      list_file = self.get_list_file(group, type, protocol)
+      if model_ids is None:
+        return self.m_list_reader.read_list(list_file, group, type)
+      return self.m_list_reader.read_list_for_models(list_file, group, type, model_ids)
 
     # first, collect all the lists that we want to process
     lists = []
     probe_lists = []
     if 'world' in groups:
-      lists.append(self.m_list_reader.read_list(self.get_list_file('world', protocol=protocol), 'world'))
+      lists.append(read('world'))
     if 'optional_world_1' in groups:
-      lists.append(self.m_list_reader.read_list(self.get_list_file('optional_world_1', protocol=protocol), 'optional_world_1'))
+      lists.append(read('optional_world_1'))
     if 'optional_world_2' in groups:
-      lists.append(self.m_list_reader.read_list(self.get_list_file('optional_world_2', protocol=protocol), 'optional_world_2'))
+      lists.append(read('optional_world_2'))
 
     for group in ('dev', 'eval'):
       if group in groups:
         if 'enroll' in purposes:
-          lists.append(self.m_list_reader.read_list(self.get_list_file(group, 'for_models', protocol=protocol), group, 'for_models'))
+          lists.append(read(group, 'for_models'))
         if 'probe' in purposes:
           if self.m_use_dense_probes:
             probe_lists.append(self.m_list_reader.read_list(self.get_list_file(group, 'for_probes', protocol=protocol), group, 'for_probes'))
           else:
-            probe_lists.append(self.m_list_reader.read_list(self.get_list_file(group, 'for_scores', protocol=protocol), group, 'for_scores'))
+            probe_lists.append(read(group, 'for_scores'))
 
     # now, go through the lists and filter the elements
 
@@ -612,6 +800,129 @@ class Database(bob.db.verification.utils.ZTDatabase):
     return retval
 
 
+  def objects_by_client(self, protocol=None, groups=None):
+    """Returns the :py:class:`File` objects of the training lists grouped by client.
+
+    The files are taken from the per-client index of the lists, which is created once per list, instead of grouping the result of :py:meth:`objects`.
+
+    Keyword Parameters:
+
+    protocol : str or ``None``
+      The protocol to consider
+
+    groups : str or [str] or ``None``
+      The training groups to consider ("world", "optional_world_1", "optional_world_2"); by default, only "world" is used
+
+    Returns: A dictionary from client ids to lists of :py:class:`File` objects, in the order of the first appearance of the clients and files in the lists
+    """
+    groups = self.check_parameters_for_validity(groups, "group", ('world', 'optional_world_1', 'optional_world_2'), default_parameters=('world',))
+    self.__refresh__(protocol, groups)
+    key = ('objects_by_client', protocol, tuple(sorted(set(groups))))
+    index = self.m_query_cache.get(key, self.m_list_reader.m_generation, lambda: self.__objects_by_client__(protocol, groups))
+    # returns copies, so that the caller might modify the returned lists
+    return collections.OrderedDict((client_id, FileList(files)) for client_id, files in index.items())
+
+
+  def __objects_by_client__(self, protocol, groups):
+    # as in objects(), each file is returned only once
+    file_ids = set()
+    retval = collections.OrderedDict()
+    for group in groups:
+      index = self.m_list_reader.read_client_index(self.get_list_file(group, protocol=protocol), group)
+      for client_id, files in index.items():
+        for file in files:
+          if file.id not in file_ids:
+            file_ids.add(file.id)
+            retval.setdefault(client_id, []).append(file)
+    return retval
+
+
+  def fingerprint(self, protocol=None, groups=None):
+    """Returns a hash of the content of the file lists of the given protocol and groups.
+
+    The hash is computed from the parsed lists, so that it changes when the files, clients or models of the lists change, but not when, e.g., only white space is modified.
+    The hash of each list is stored with the cached list and updated with appended lines only, so that the fingerprint of unchanged lists is returned immediately.
+
+    Keyword Parameters:
+
+    protocol : str or ``None``
+      The protocol to consider
+
+    groups : str or [str] or ``None``
+      The groups to consider ("dev", "eval", "world", "optional_world_1", "optional_world_2"); by default, all groups are considered
+
+    Returns: A hexadecimal SHA-1 digest
+    """
+    import hashlib
+    hash = hashlib.sha1()
+    for group, type, list_file in self.list_files(protocol, groups):
+      hash.update(('%s %s ' % (group, type)).encode('utf-8'))
+      hash.update(self.m_list_reader.read_fingerprint(list_file, group, type))
+    return hash.hexdigest()
+
+
+  def sample_objects(self, protocol=None, groups=None, files_per_client=None, client_count=None, seed=0):
+    """Returns a deterministic random sample of the :py:class:`File` objects of the training lists.
+
+    The files are taken from a per-client index of the lists, so that only the files of the sampled clients are visited.
+    When the lists are not kept in memory, only the lines of the sampled clients are read, using the seek index.
+
+    Keyword Parameters:
+
+    protocol : str or ``None``
+      The protocol to consider
+
+    groups : str or [str] or ``None``
+      The training groups to sample from ("world", "optional_world_1", "optional_world_2"); by default, only "world" is used
+
+    files_per_client : int or ``None``
+      The maximum number of files of each client; if ``None``, all files of the sampled clients are returned
+
+    client_count : int or ``None``
+      The number of clients to sample; if ``None``, all clients are used
+
+    seed : int or ``None``
+      The seed of the random number generator; the same seed returns the same sample
+
+    Returns: A list of :py:class:`File` objects, ordered by client id; the files of each client are in the order of the lists
+    """
+    from .sampling import sample_objects
+    groups = self.check_parameters_for_validity(groups, "group", ('world', 'optional_world_1', 'optional_world_2'), default_parameters=('world',))
+    self.__refresh__(protocol, groups)
+    return FileList(sample_objects(self, protocol, groups, files_per_client, client_count, seed))
+
+
+  def paths(self, files_or_query=None, directory=None, extension=None):
+    """Returns the full paths of the given files, as :py:meth:`File.make_path` would return them.
+
+    Keyword Parameters:
+
+    files_or_query : [:py:class:`File`] or dict or ``None``
+      The files, or the keyword arguments of an :py:meth:`objects` query, e.g., ``{'groups' : 'world'}``; ``None`` is the same as an empty query.
+      The paths of query results are stored together with the cached query result, and reused for the same directory and extension.
+
+    directory : str or ``None``
+      The directory to prepend; if ``None``, the current directory ``'.'`` is used
+
+    extension : str or ``None``
+      The extension to append to the paths
+
+    Returns: A list of the full paths, in the order of the files
+    """
+    if files_or_query is not None and not isinstance(files_or_query, dict):
+      return _make_paths(files_or_query, directory, extension)
+
+    query = files_or_query or {}
+    if self.m_query_client is not None:
+      return _make_paths(self.objects(**query), directory, extension)
+    key, parameters = self.__objects_query__(query.get('protocol'), query.get('purposes'), query.get('model_ids'), query.get('groups'), query.get('classes'))
+    self.__refresh__(parameters[0], parameters[3])
+    generation = self.m_list_reader.m_generation
+    files = lambda: self.m_query_cache.get(key, generation, lambda: self.__objects__(*parameters))
+    # returns a copy, so that the caller might modify the returned list
+    return list(self.m_query_cache.get(('paths', key, directory, extension), generation, lambda: _make_paths(files(), directory, extension)))
+
+
   def tobjects(self, protocol=None, model_ids=None, groups=None):
     """Returns a list of :py:class:`File` objects for enrolling T-norm models for score normalization.
 
@@ -631,18 +942,31 @@ class Database(bob.db.verification.utils.ZTDatabase):
     Returns: A list of :py:class:`File` objects considering all the filtering criteria.
     """
 
+    if self.m_query_client is not None:
+      return self.__forward__('tobjects', protocol=protocol, model_ids=model_ids, groups=groups)
+
     groups = self.check_parameters_for_validity(groups, "group", ('dev', 'eval'))
 
-    if(isinstance(model_ids, six.string_types)):
+    if(isinstance(model_ids, string_types)):
       model_ids = (model_ids,)
+    if model_ids is not None:
+      model_ids = tuple(sorted(set(model_ids)))
 
+    # the result lists the groups in the given order
+    key = ('tobjects', protocol, tuple(groups), model_ids)
+    return self.__cached_query__(key, lambda: self.__tobjects__(protocol, model_ids, groups), protocol, groups)
+
+
+  def __tobjects__(self, protocol, model_ids, groups):
     # iterate over the lists and extract the files
     # we assume that there is no duplicate file here...
     retval = []
     for group in groups:
-      for file in self.m_list_reader.read_list(self.get_list_file(group, 'for_tnorm', protocol), group, 'for_tnorm'):
-        if model_ids is None or file._model_id in model_ids:
-          retval.append(file)
+      list_file = self.get_list_file(group, 'for_tnorm', protocol)
+      if model_ids is None:
+        retval.extend(self.m_list_reader.read_list(list_file, group, 'for_tnorm'))
+      else:
+        retval.extend(self.m_list_reader.read_list_for_models(list_file, group, 'for_tnorm', model_ids))
 
     return retval
 
@@ -661,8 +985,16 @@ class Database(bob.db.verification.utils.ZTDatabase):
     Returns: A list of File objects considering all the filtering criteria.
     """
 
+    if self.m_query_client is not None:
+      return self.__forward__('zobjects', protocol=protocol, groups=groups)
+
     groups = self.check_parameters_for_validity(groups, "group", ('dev', 'eval'))
 
+    key = ('zobjects', protocol, tuple(groups))
+    return self.__cached_query__(key, lambda: self.__zobjects__(protocol, groups), protocol, groups)
+
+
+  def __zobjects__(self, protocol, groups):
     # iterate over the lists and extract the files
     # we assume that there is no duplicate file here...
     retval = []
@@ -672,6 +1004,76 @@ class Database(bob.db.verification.utils.ZTDatabase):
     return retval
 
 
+  def zt_alignment(self, protocol=None, group='dev'):
+    """Returns integer index arrays that align the models, probe files, T-Norm models and Z-Norm files of the given protocol and group.
+
+    The alignment is computed only once and shared by all callers, hence the returned arrays are read-only.
+    This function requires NumPy.
+
+    Keyword Parameters:
+
+    protocol : str or ``None``
+      The protocol to consider
+
+    group : str
+      The group to consider ("dev" or "eval")
+
+    Returns: A :py:class:`bob.db.verification.filelist.arrays.ZTAlignment`
+    """
+    from .arrays import zt_alignment
+    assert group in ('dev', 'eval')
+    self.__refresh__(protocol, (group,))
+    return self.m_query_cache.get(('zt_alignment', protocol, group), self.m_list_reader.m_generation, lambda: zt_alignment(self, protocol, group))
+
+
+  def dense_trials(self, protocol=None, group='dev', model_tile=64, probe_tile=1024):
+    """Returns the trials of dense probing, i.e., all models compared to all files of the ``for_probes`` list, in blocks of models and probe files.
+
+    The numbers of models, probe files, trials and blocks are available before iterating; the list of all trials is never created.
+
+    Keyword Parameters:
+
+    protocol : str or ``None``
+      The protocol to consider
+
+    group : str
+      The group to consider ("dev" or "eval")
+
+    model_tile, probe_tile : int
+      The maximum numbers of models and probe files in each block
+
+    Returns: A :py:class:`bob.db.verification.filelist.trials.DenseTrials`
+    """
+    from .trials import DenseTrials
+    self.__refresh__(protocol, (group,))
+    return DenseTrials(self, protocol, group, model_tile, probe_tile)
+
+
+  def iter_trials(self, protocol=None, group='dev', chunk_size=1024):
+    """Yields the trials of the ``for_scores`` list of the given protocol and group in chunks, grouped by model.
+
+    Other than :py:meth:`objects`, probe files that appear several times are not removed, so that each line of the list is one trial.
+    When the lists are not kept in memory, the lines of one model at a time are read using the seek index.
+    For dense probing, see :py:meth:`dense_trials`.
+
+    Keyword Parameters:
+
+    protocol : str or ``None``
+      The protocol to consider
+
+    group : str
+      The group to consider ("dev" or "eval")
+
+    chunk_size : int
+      The maximum number of trials in each chunk
+
+    Returns: A generator of lists of tuples ``(model_id, probe, genuine)``, where ``probe`` is a :py:class:`File` and ``genuine`` is ``True`` if the probe belongs to the claimed client
+    """
+    from .trials import iter_trials
+    self.__refresh__(protocol, (group,))
+    return iter_trials(self, protocol, group, chunk_size)
+
+
   def annotations(self, file):
     """Reads the annotations for the given file id from file and returns them in a dictionary.
 
@@ -695,6 +1097,79 @@ class Database(bob.db.verification.utils.ZTDatabase):
     return bob.db.verification.utils.read_annotation_file(annotation_file, self.m_annotation_type)
 
 
+  def prefetch(self, files, loader=None, read_ahead=16, workers=4, annotations=False):
+    """Loads the original data files of the given files ahead of their use, in a pool of threads.
+
+    The original file names are resolved by :py:meth:`original_file_name`, including several original extensions.
+    While the consumer processes one file, the next files are already loaded, which hides the latency of slow (network) storage.
+
+    Keyword parameters:
+
+    files : [:py:class:`File`]
+      The files to load, e.g., as returned by :py:meth:`objects`; any iterable of files is consumed only as far as required
+
+    loader : callable or ``None``
+      The function that loads the data from the original file name; by default, :py:func:`bob.io.base.load` is used
+
+    read_ahead : int
+      The maximum number of files that are loaded before they are consumed
+
+    workers : int
+      The number of threads that load the files
+
+    annotations : bool
+      Shall the :py:meth:`annotations` of the files be read as well?
+
+    Returns: a generator of tuples ``(file, data, annotations)`` in the order of the given files, where ``annotations`` is ``None`` unless requested
+    """
+    from .prefetch import prefetch
+    return prefetch(self, files, loader, read_ahead, workers, annotations)
+
+
+  def apreload(self, protocol=None, groups=None, executor=None):
+    """Reads all file lists of the given protocol and groups into memory, without blocking the :py:mod:`asyncio` event loop.
+
+    The lists are read in the given ``executor`` (by default, the executor of the event loop).
+    Lists that are currently read by another coroutine are not read twice.
+
+    Keyword Parameters:
+
+    protocol : str or ``None``
+      The protocol to consider
+
+    groups : str or [str] or ``None``
+      The groups to consider ("dev", "eval", "world", "optional_world_1", "optional_world_2").
+
+    executor : :py:class:`concurrent.futures.Executor` or ``None``
+      The executor in which the lists are read
+
+    Returns: an awaitable
+    """
+    from .aio import preload
+    return preload(self, protocol, groups, executor)
+
+
+  def aobjects(self, protocol=None, purposes=None, model_ids=None, groups=None, classes=None, executor=None):
+    """The :py:mod:`asyncio` version of :py:meth:`objects`.
+
+    The required lists are read as in :py:meth:`apreload`, and the query is run in the given ``executor``.
+    All other parameters are identical to :py:meth:`objects`.
+
+    Returns: an awaitable, which results in a list of :py:class:`File` objects
+    """
+    from .aio import objects
+    return objects(self, protocol, purposes, model_ids, groups, classes, executor)
+
+
+  def aannotations_batch(self, files, executor=None):
+    """Reads the annotations for all given files in the given ``executor``, see :py:meth:`annotations`.
+
+    Returns: an awaitable, which results in a list of annotations, one for each of the given files
+    """
+    from .aio import annotations_batch
+    return annotations_batch(self, files, executor)
+
+
   def original_file_name(self, file, check_existence = True):
     """Returns the original file name of the given file.
 
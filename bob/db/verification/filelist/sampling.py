@@ -0,0 +1,57 @@
+#!/usr/bin/env python
+# vim: set fileencoding=utf-8 :
+#
+# Copyright (C) 2011-2013 Idiap Research Institute, Martigny, Switzerland
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, version 3 of the License.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""Deterministic sampling of the files of the training lists by client, see :py:meth:`bob.db.verification.filelist.Database.sample_objects`."""
+
+import random
+
+# the groups that can be sampled
+WORLD_GROUPS = ('world', 'optional_world_1', 'optional_world_2')
+
+
+def sample_objects(database, protocol = None, groups = None, files_per_client = None, client_count = None, seed = 0):
+  """Samples clients and files of the given training groups, using the per-client index of the list reader.
+
+  The clients are chosen from the sorted client ids, and the files of each client keep the order of the lists, so that the result depends only on the lists and the ``seed``.
+  """
+  groups = database.check_parameters_for_validity(groups, "group", WORLD_GROUPS, default_parameters=('world',))
+  for name, value in (('files_per_client', files_per_client), ('client_count', client_count)):
+    if value is not None and value < 0:
+      raise ValueError("The parameter '%s' must not be negative, not %d" % (name, value))
+  reader = database.m_list_reader
+  lists = [(group, database.get_list_file(group, protocol=protocol)) for group in groups]
+  rng = random.Random(seed)
+
+  client_ids = sorted(set().union(*[reader.read_client_ids(list_file, group) for group, list_file in lists]))
+  if client_count is not None and client_count < len(client_ids):
+    client_ids = sorted(rng.sample(client_ids, client_count))
+
+  # only the files of the chosen clients are collected
+  indexes = [reader.read_client_index(list_file, group, client_ids = client_ids) for group, list_file in lists]
+  retval = []
+  for client_id in client_ids:
+    file_ids = set()
+    files = []
+    for index in indexes:
+      for file in index.get(client_id, ()):
+        if file.id not in file_ids:
+          file_ids.add(file.id)
+          files.append(file)
+    if files_per_client is not None and len(files) > files_per_client:
+      files = [files[i] for i in sorted(rng.sample(range(len(files)), files_per_client))]
+    retval.extend(files)
+  return retval
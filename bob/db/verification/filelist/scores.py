@@ -0,0 +1,160 @@
+#!/usr/bin/env python
+# vim: set fileencoding=utf-8 :
+#
+# Copyright (C) 2011-2013 Idiap Research Institute, Martigny, Switzerland
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, version 3 of the License.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""Labelling of score files with the trials of a protocol.
+
+Score files are expected in the four column format ``claimed_id real_id probe_path score``, where the claimed id is used as the model id, or in the five column format ``claimed_id model_id real_id probe_path score``.
+Each line is joined with the trial of the same model and probe in the ``for_scores.lst`` (or, when dense probing is used, the ``for_models.lst`` and the ``for_probes.lst``), which defines whether the trial is genuine or impostor.
+The score file is read line by line, only the trials of the protocol are kept in memory.
+The labelled trials are recorded in one bit per trial of each model, so that the memory does not grow with the size of the score file.
+"""
+
+GENUINE = 'genuine'
+IMPOSTOR = 'impostor'
+# trials that are not defined by the protocol, or that appear a second time
+UNEXPECTED = 'unexpected'
+
+
+class ScoreLabeller:
+  """Labels the lines of score files with the trials of the given protocol and group.
+
+  Keyword parameters:
+
+  database : :py:class:`bob.db.verification.filelist.Database`
+    The database that defines the trials
+
+  protocol : str or ``None``
+    The protocol to consider
+
+  group : str
+    The group of the score file ("dev" or "eval")
+  """
+
+  def __init__(self, database, protocol = None, group = 'dev'):
+    assert group in ('dev', 'eval')
+    reader = database.m_list_reader
+    self.m_dense = database.m_use_dense_probes
+    if self.m_dense:
+      # all probes are compared to all models; each probe has the same index for all models
+      self.m_models = reader.read_models(database.get_list_file(group, 'for_models', protocol), group, 'for_models')
+      self.m_probes = {}
+      for file in reader.read_list(database.get_list_file(group, 'for_probes', protocol), group, 'for_probes'):
+        self.m_probes.setdefault(file.path, (len(self.m_probes), file.client_id))
+      self.m_trials = None
+      self.m_count = len(self.m_models) * len(self.m_probes)
+    else:
+      # the trial of each model and probe is genuine, if the probe belongs to the claimed client; the probes are indexed per model
+      self.m_trials = {}
+      self.m_count = 0
+      for file in reader.read_list(database.get_list_file(group, 'for_scores', protocol), group, 'for_scores'):
+        probes = self.m_trials.setdefault(file._model_id, {})
+        if file.path not in probes:
+          probes[file.path] = (len(probes), file.client_id == file.claimed_id)
+          self.m_count += 1
+    # the labelled trials of each model, one bit per probe index
+    self.m_seen = {}
+    self.m_labelled = 0
+    self.m_unexpected = 0
+
+
+  def __len__(self):
+    """The number of trials defined by the protocol."""
+    return self.m_count
+
+
+  def _trial(self, model_id, probe_path):
+    # returns the index of the probe for the given model, and whether the trial is genuine, or ``None`` for unknown trials
+    if self.m_dense:
+      client_id = self.m_models.get(model_id)
+      probe = self.m_probes.get(probe_path)
+      if client_id is None or probe is None:
+        return None
+      return probe[0], client_id == probe[1]
+    return self.m_trials.get(model_id, {}).get(probe_path)
+
+
+  def _model_size(self, model_id):
+    return len(self.m_probes) if self.m_dense else len(self.m_trials[model_id])
+
+
+  def _label(self, model_id, probe_path):
+    trial = self._trial(model_id, probe_path)
+    if trial is None:
+      self.m_unexpected += 1
+      return UNEXPECTED
+    index, genuine = trial
+    seen = self.m_seen.get(model_id)
+    if seen is None:
+      seen = self.m_seen[model_id] = bytearray((self._model_size(model_id) + 7) // 8)
+    if seen[index >> 3] & (1 << (index & 7)):
+      self.m_unexpected += 1
+      return UNEXPECTED
+    seen[index >> 3] |= 1 << (index & 7)
+    self.m_labelled += 1
+    return GENUINE if genuine else IMPOSTOR
+
+
+  def label(self, lines):
+    """Labels the given lines of a score file.
+
+    Returns: a generator of tuples ``(label, line)``, where the label is one of ``'genuine'``, ``'impostor'`` and ``'unexpected'``
+    """
+    for line in lines:
+      fields = line.split()
+      if not fields:
+        continue
+      if len(fields) not in (4, 5):
+        raise ValueError("The score line '%s' does not have four or five columns" % line.rstrip())
+      yield self._label(fields[1] if len(fields) == 5 else fields[0], fields[-2]), line
+
+
+  def missing(self):
+    """Iterates over the ``(model_id, probe_path)`` of the trials that have not been labelled yet.
+
+    The trials are generated while iterating, so that taking only the first few of them is fast; use :py:meth:`missing_count` for their number.
+    """
+    for model_id in (self.m_models if self.m_dense else self.m_trials):
+      probes = self.m_probes if self.m_dense else self.m_trials[model_id]
+      seen = self.m_seen.get(model_id)
+      for probe_path, (index, _) in probes.items():
+        if seen is None or not seen[index >> 3] & (1 << (index & 7)):
+          yield model_id, probe_path
+
+
+  def missing_count(self):
+    """Returns the number of trials that have not been labelled yet."""
+    return self.m_count - self.m_labelled
+
+
+  def unexpected(self):
+    """Returns the number of lines that did not match a trial of the protocol."""
+    return self.m_unexpected
+
+
+def label_score_file(database, score_file, protocol = None, group = 'dev'):
+  """Labels the lines of the given score file, see :py:class:`ScoreLabeller`.
+
+  Returns: the :py:class:`ScoreLabeller`, which can be asked for missing trials after the lines have been read, and a generator of ``(label, line)`` tuples
+  """
+  labeller = ScoreLabeller(database, protocol, group)
+
+  def lines():
+    with open(score_file) as f:
+      for label, line in labeller.label(f):
+        yield label, line
+
+  return labeller, lines()
@@ -0,0 +1,185 @@
+#!/usr/bin/env python
+# vim: set fileencoding=utf-8 :
+#
+# Copyright (C) 2011-2013 Idiap Research Institute, Martigny, Switzerland
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, version 3 of the License.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""A query daemon that keeps the file lists in memory and answers queries over a Unix domain socket.
+
+The daemon is started with the ``serve`` command of ``bob_dbmanage.py``, or with :py:func:`serve`.
+Clients create their :py:class:`bob.db.verification.filelist.Database` with the ``query_server`` parameter set to the socket of the daemon, and the queries are forwarded to the daemon.
+
+Each request is a single line containing a JSON dictionary with the ``method`` and its ``kwargs``.
+Each response is a line containing a JSON header with the ``status``, the ``type`` and the ``length`` of the payload, followed by the payload.
+Lists of files are transferred in the format of :py:mod:`bob.db.verification.filelist.columnar`, all other results as JSON.
+"""
+
+import os
+import json
+import socket
+import threading
+
+from .columnar import encode_files, decode_files
+
+# the queries that are answered by the daemon
+METHODS = ('objects', 'tobjects', 'zobjects', 'model_ids', 'client_ids')
+
+# exceptions that are raised with their original type on the client side
+_EXCEPTIONS = dict((e.__name__, e) for e in (ValueError, RuntimeError, IOError, KeyError))
+
+
+def _handler_class(database, lock):
+  import socketserver
+
+  class QueryHandler (socketserver.StreamRequestHandler):
+    """Answers the queries of a single client connection."""
+
+    def _respond(self, header, payload = b''):
+      header['length'] = len(payload)
+      self.wfile.write(json.dumps(header).encode('utf-8') + b'\n')
+      self.wfile.write(payload)
+      self.wfile.flush()
+
+    def handle(self):
+      for line in self.rfile:
+        try:
+          request = json.loads(line.decode('utf-8'))
+          method = request['method']
+          if method == 'info':
+            self._respond({'status' : 'ok', 'type' : 'json'}, json.dumps({'use_dense_probes' : database.m_use_dense_probes}).encode('utf-8'))
+            continue
+          if method not in METHODS:
+            raise ValueError("The query '%s' is not supported by the query server; use one of %s" % (method, METHODS))
+          # the database caches are not thread-safe
+          with lock:
+            result = getattr(database, method)(**request.get('kwargs', {}))
+        except Exception as e:
+          self._respond({'status' : 'error', 'type' : type(e).__name__, 'message' : str(e)})
+          continue
+        if method in ('objects', 'tobjects', 'zobjects'):
+          self._respond({'status' : 'ok', 'type' : 'files'}, encode_files(result))
+        else:
+          self._respond({'status' : 'ok', 'type' : 'set' if isinstance(result, set) else 'json'}, json.dumps(list(result)).encode('utf-8'))
+
+  return QueryHandler
+
+
+def create_server(database, socket_path, protocols = None):
+  """Reads the lists of the given protocols and creates a server listening on the given Unix domain socket.
+
+  Keyword parameters:
+
+  database : :py:class:`bob.db.verification.filelist.Database`
+    The database that answers the queries; it must keep the read lists in memory
+
+  socket_path : str
+    The file name of the socket; an existing socket file is replaced
+
+  protocols : str or [str] or ``None``
+    The protocols, whose lists are read before the first query is answered
+
+  Returns: a :py:class:`socketserver.UnixStreamServer`, which answers queries when its ``serve_forever`` method is called
+  """
+  import socketserver
+
+  if protocols is None or isinstance(protocols, str):
+    protocols = (protocols,)
+  for protocol in protocols:
+    for group, type, list_file in database.list_files(protocol):
+      database.m_list_reader.read_list(list_file, group, type)
+
+  if os.path.exists(socket_path):
+    os.remove(socket_path)
+
+  class Server (socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def server_close(self):
+      socketserver.UnixStreamServer.server_close(self)
+      if os.path.exists(socket_path):
+        os.remove(socket_path)
+
+  return Server(socket_path, _handler_class(database, threading.Lock()))
+
+
+def serve(database, socket_path, protocols = None):
+  """Answers queries on the given Unix domain socket until interrupted, see :py:func:`create_server`."""
+  server = create_server(database, socket_path, protocols)
+  try:
+    server.serve_forever()
+  finally:
+    server.server_close()
+
+
+class QueryClient:
+  """Forwards queries to a query daemon listening on the given Unix domain socket.
+
+  The client can be used by several threads; their queries are sent over the same connection one after the other.
+  """
+
+  def __init__(self, socket_path):
+    self.m_socket_path = socket_path
+    self.m_connection = None
+    # the request and the response of a query must not interleave with those of other threads
+    self.m_lock = threading.Lock()
+
+  def __getstate__(self):
+    # connections cannot be shared between processes
+    return {'m_socket_path' : self.m_socket_path}
+
+  def __setstate__(self, state):
+    self.__init__(state['m_socket_path'])
+
+  def _connect(self):
+    if self.m_connection is None:
+      connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+      connection.connect(self.m_socket_path)
+      self.m_connection = connection.makefile('rwb')
+      connection.close()
+    return self.m_connection
+
+  def close(self):
+    """Closes the connection to the daemon."""
+    with self.m_lock:
+      self._close()
+
+  def _close(self):
+    if self.m_connection is not None:
+      self.m_connection.close()
+      self.m_connection = None
+
+  def query(self, method, **kwargs):
+    """Sends the given query to the daemon and returns the result."""
+    request = json.dumps({'method' : method, 'kwargs' : kwargs}).encode('utf-8') + b'\n'
+    with self.m_lock:
+      try:
+        connection = self._connect()
+        connection.write(request)
+        connection.flush()
+        header = connection.readline()
+        if not header:
+          raise IOError("The connection to the query server '%s' was closed." % self.m_socket_path)
+        header = json.loads(header.decode('utf-8'))
+        payload = connection.read(header['length'])
+      except (IOError, OSError):
+        self._close()
+        raise
+
+    if header['status'] != 'ok':
+      raise _EXCEPTIONS.get(header['type'], RuntimeError)(header['message'])
+    if header['type'] == 'files':
+      from .models import FileList
+      return FileList(decode_files(payload))
+    result = json.loads(payload.decode('utf-8'))
+    return set(result) if header['type'] == 'set' else result
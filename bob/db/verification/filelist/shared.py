@@ -0,0 +1,175 @@
+#!/usr/bin/env python
+# vim: set fileencoding=utf-8 :
+#
+# Copyright (C) 2011-2013 Idiap Research Institute, Martigny, Switzerland
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, version 3 of the License.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""Sharing the parsed file lists between processes using :py:mod:`multiprocessing.shared_memory`.
+
+A parent process publishes the lists of a :py:class:`bob.db.verification.filelist.Database` in a :py:class:`SharedListStore`.
+Worker processes create their :py:class:`bob.db.verification.filelist.Database` with the ``shared_list_store`` parameter set to the :py:attr:`SharedListStore.name`, and read the lists from the shared memory segment instead of parsing the list files.
+
+.. note::
+   The store saves the parsing of the lists in each worker, but not the memory for the lists:
+   a worker decodes each list that it queries into its own :py:class:`bob.db.verification.filelist.File` objects, which are kept in the cache of its database.
+   Hence, the memory of each worker still grows with the size of the lists that it uses.
+"""
+
+import atexit
+import json
+import os
+import struct
+
+from .columnar import encode_files
+
+# magic and the length of the directory of lists
+_HEADER = struct.Struct('<4sI')
+_MAGIC = b'BFLS'
+_ALIGNMENT = 8
+# the attached stores, which are closed when the process ends
+_ATTACHED_STORES = set()
+# the names of the segments created by this process, which are registered with the resource tracker
+_CREATED_SEGMENTS = set()
+
+
+def _close_attached_stores():
+  # the segments can only be closed after all views into them are released
+  for store in list(_ATTACHED_STORES):
+    store.close()
+
+atexit.register(_close_attached_stores)
+
+
+def _shared_memory():
+  try:
+    from multiprocessing import shared_memory
+  except ImportError:
+    raise RuntimeError("Shared list stores require the multiprocessing.shared_memory module of Python 3.8 or later.")
+  return shared_memory
+
+
+def _aligned(size):
+  return (size + _ALIGNMENT - 1) // _ALIGNMENT * _ALIGNMENT
+
+
+class SharedListStore:
+  """Stores the file lists of the given protocols of the given database in a shared memory segment.
+
+  The lists are read by the given ``database`` (and stay in its cache), encoded in the format of :py:func:`bob.db.verification.filelist.columnar.encode_files`, and copied into a new segment.
+  The process that created the store is responsible to :py:meth:`close` it, which removes the segment.
+  Use :py:meth:`attach` to access an existing store.
+
+  Keyword parameters:
+
+  database : :py:class:`bob.db.verification.filelist.Database`
+    The database that should read the lists
+
+  protocols : str or [str] or ``None``
+    The protocols, whose lists should be stored; ``None`` stores the lists of the base directory itself
+  """
+
+  def __init__(self, database = None, protocols = None, _segment = None):
+    shared_memory = _shared_memory()
+    if _segment is not None:
+      # attach to an existing store
+      self.m_segment = _segment
+      self.m_owner = False
+    else:
+      if protocols is None or isinstance(protocols, str):
+        protocols = (protocols,)
+      buffers = {}
+      for protocol in protocols:
+        for group, type, list_file in database.list_files(protocol):
+          buffers[list_file] = encode_files(database.m_list_reader.read_list(list_file, group, type))
+
+      # compute the layout of the segment
+      directory = {}
+      offset = 0
+      for list_file in sorted(buffers):
+        directory[list_file] = (offset, len(buffers[list_file]))
+        offset = _aligned(offset + len(buffers[list_file]))
+      header = json.dumps(directory).encode('utf-8')
+      start = _aligned(_HEADER.size + len(header))
+
+      self.m_segment = shared_memory.SharedMemory(create = True, size = max(start + offset, 1))
+      self.m_owner = True
+      _CREATED_SEGMENTS.add(self.m_segment.name)
+      self.m_segment.buf[:_HEADER.size] = _HEADER.pack(_MAGIC, len(header))
+      self.m_segment.buf[_HEADER.size : _HEADER.size + len(header)] = header
+      for list_file, (position, length) in directory.items():
+        self.m_segment.buf[start + position : start + position + length] = buffers[list_file]
+
+    self.m_lists = self._read_directory()
+
+
+  @classmethod
+  def attach(cls, name):
+    """Attaches to the existing store with the given :py:attr:`name` without copying its content."""
+    shared_memory = _shared_memory()
+    try:
+      segment = shared_memory.SharedMemory(name = name, track = False)
+    except TypeError:
+      # Python < 3.13 registers the segment with the resource tracker, which would remove it when this process ends;
+      # the segment belongs to the creator of the store, hence the registration is undone, unless this process created it
+      segment = shared_memory.SharedMemory(name = name)
+      if os.name == 'posix' and segment.name not in _CREATED_SEGMENTS:
+        from multiprocessing import resource_tracker
+        resource_tracker.unregister('/' + segment.name, 'shared_memory')
+    store = cls(_segment = segment)
+    _ATTACHED_STORES.add(store)
+    return store
+
+
+  def _read_directory(self):
+    buffer = self.m_segment.buf
+    magic, length = _HEADER.unpack_from(buffer)
+    if magic != _MAGIC:
+      raise ValueError("The shared memory segment '%s' does not contain file lists." % self.name)
+    directory = json.loads(bytes(buffer[_HEADER.size : _HEADER.size + length]).decode('utf-8'))
+    start = _aligned(_HEADER.size + length)
+    return dict((list_file, buffer[start + position : start + position + size]) for list_file, (position, size) in directory.items())
+
+
+  @property
+  def name(self):
+    """The name of the shared memory segment, which can be passed to worker processes."""
+    return self.m_segment.name
+
+
+  def lists(self):
+    """Returns a dictionary from list file names to the (shared) buffers of the encoded lists."""
+    return self.m_lists
+
+
+  def close(self):
+    """Releases the shared memory segment; the owner of the store also removes the segment."""
+    if self.m_segment is None:
+      return
+    # the views into the segment need to be released before the segment can be closed
+    for view in self.m_lists.values():
+      view.release()
+    self.m_lists = {}
+    self.m_segment.close()
+    if self.m_owner:
+      self.m_segment.unlink()
+      _CREATED_SEGMENTS.discard(self.m_segment.name)
+    _ATTACHED_STORES.discard(self)
+    self.m_segment = None
+
+
+  def __enter__(self):
+    return self
+
+  def __exit__(self, *args):
+    self.close()
@@ -0,0 +1,194 @@
+#!/usr/bin/env python
+# vim: set fileencoding=utf-8 :
+#
+# Copyright (C) 2011-2013 Idiap Research Institute, Martigny, Switzerland
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, version 3 of the License.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""An indexed SQLite representation of the file lists.
+
+Use :py:func:`compile_lists` (or the ``compile`` command of ``bob_dbmanage.py``) to convert the file lists of one or several protocols into an SQLite file.
+When this file is passed as the ``sqlite_file`` parameter to the :py:class:`bob.db.verification.filelist.Database`, all queries are answered from the SQLite file.
+"""
+
+import os
+import sqlite3
+
+from .models import File, ListReader, PARALLEL_THRESHOLD
+
+_TABLES = (
+  "CREATE TABLE list (path TEXT PRIMARY KEY, protocol TEXT NOT NULL, grp TEXT NOT NULL, purpose TEXT NOT NULL)",
+  "CREATE TABLE file (protocol TEXT NOT NULL, grp TEXT NOT NULL, purpose TEXT NOT NULL, path TEXT NOT NULL, model_id TEXT NOT NULL, claimed_id TEXT NOT NULL, client_id TEXT NOT NULL)",
+)
+
+# the indexes are created after all files are inserted, which is much faster
+_INDEXES = (
+  # entries with identical keys are sorted by rowid, which keeps the order of the list files
+  "CREATE INDEX file_list ON file (protocol, grp, purpose)",
+  "CREATE INDEX file_model ON file (protocol, grp, purpose, model_id)",
+  "CREATE INDEX file_client ON file (protocol, grp, purpose, client_id)",
+)
+
+
+# SQLite limits the number of parameters of a query
+_MAX_PARAMETERS = 500
+
+
+def _relative_path(list_file, base_dir):
+  return os.path.relpath(list_file, base_dir).replace(os.sep, '/')
+
+
+def compile_lists(database, sqlite_file, protocols = None):
+  """Writes the file lists of the given protocols into a new SQLite file.
+
+  Keyword parameters:
+
+  database : :py:class:`bob.db.verification.filelist.Database`
+    The database, whose lists should be compiled
+
+  sqlite_file : str
+    The name of the SQLite file to write; an existing file will be overwritten
+
+  protocols : str or [str] or ``None``
+    The protocols to compile; ``None`` compiles the lists of the base directory itself and of all :py:meth:`bob.db.verification.filelist.Database.protocols`
+
+  Returns: the number of lists that were written
+  """
+  if protocols is None:
+    protocols = [None] + database.protocols()
+  elif isinstance(protocols, str):
+    protocols = (protocols,)
+  if os.path.exists(sqlite_file):
+    os.remove(sqlite_file)
+
+  # the lists are parsed with a temporary reader, which does not keep them in memory
+  reader = ListReader(False)
+  connection = sqlite3.connect(sqlite_file)
+  count = 0
+  try:
+    # a failed compilation leaves an unusable file anyways, so there is no need for a journal
+    connection.execute("PRAGMA journal_mode = OFF")
+    connection.execute("PRAGMA synchronous = OFF")
+    for statement in _TABLES:
+      connection.execute(statement)
+    for protocol in protocols:
+      for group, type, list_file in database.list_files(protocol):
+        key = (protocol or '', group, type or 'world')
+        connection.execute("INSERT INTO list VALUES (?,?,?,?)", (_relative_path(list_file, database.get_base_directory()),) + key)
+        connection.executemany("INSERT INTO file VALUES (?,?,?,?,?,?,?)", (key + (f.path, f._model_id, f.claimed_id, f.client_id) for f in reader.read_list(list_file, group, type)))
+        count += 1
+    for statement in _INDEXES:
+      connection.execute(statement)
+    connection.commit()
+  finally:
+    connection.close()
+  return count
+
+
+class SQLListReader (ListReader):
+  """Reads the file lists from an SQLite file generated by :py:func:`compile_lists`.
+
+  Lists that are not contained in the SQLite file are read from the list files.
+  """
+
+  def __init__(self, sqlite_file, base_dir, store_lists, parallel_threshold = PARALLEL_THRESHOLD, parallel_workers = None):
+    ListReader.__init__(self, store_lists, parallel_threshold, parallel_workers)
+    if not os.path.isfile(sqlite_file):
+      raise RuntimeError('File %s does not exist.' % (sqlite_file,))
+    self.m_sqlite_file = sqlite_file
+    self.m_base_dir = base_dir
+    self.m_connection = sqlite3.connect(sqlite_file, check_same_thread = False)
+    self.m_lists = dict((path, (protocol, grp, purpose)) for path, protocol, grp, purpose in self.m_connection.execute("SELECT path, protocol, grp, purpose FROM list"))
+
+
+  def __getstate__(self):
+    state = ListReader.__getstate__(self)
+    del state['m_connection']
+    return state
+
+  def __setstate__(self, state):
+    ListReader.__setstate__(self, state)
+    self.m_connection = sqlite3.connect(self.m_sqlite_file, check_same_thread = False)
+
+
+  def _key(self, list_file):
+    return self.m_lists.get(_relative_path(list_file, self.m_base_dir))
+
+
+  def _select(self, key, condition = '', parameters = ()):
+    return [File(file_name = path, client_id = client_id, model_id = model_id, claimed_id = claimed_id) for _, path, model_id, claimed_id, client_id in self._rows(key, condition, parameters)]
+
+  def _rows(self, key, condition = '', parameters = ()):
+    return self.m_connection.execute("SELECT rowid, path, model_id, claimed_id, client_id FROM file WHERE protocol=? AND grp=? AND purpose=?" + condition + " ORDER BY rowid", key + tuple(parameters))
+
+
+  def _read_column_list(self, list_file, column_count, state = None):
+    key = self._key(list_file)
+    if key is None:
+      return ListReader._read_column_list(self, list_file, column_count, state)
+    return self._select(key)
+
+
+  def read_list_for_models(self, list_file, group, type, model_ids):
+    """Returns the Files from the given list file that belong to one of the given model ids."""
+    key = self._key(list_file)
+    if key is None or list_file in self.m_read_lists:
+      return ListReader.read_list_for_models(self, list_file, group, type, model_ids)
+    model_ids = sorted(set(model_ids))
+    if len(model_ids) <= _MAX_PARAMETERS:
+      return self._select(key, " AND model_id IN (%s)" % ','.join('?' * len(model_ids)), model_ids)
+    # the model ids are queried in chunks, and the rows are sorted to keep the order of the list
+    rows = []
+    for start in range(0, len(model_ids), _MAX_PARAMETERS):
+      chunk = model_ids[start : start + _MAX_PARAMETERS]
+      rows.extend(self._rows(key, " AND model_id IN (%s)" % ','.join('?' * len(chunk)), chunk))
+    rows.sort()
+    return [File(file_name = path, client_id = client_id, model_id = model_id, claimed_id = claimed_id) for _, path, model_id, claimed_id, client_id in rows]
+
+
+  def iter_model_files(self, list_file, group, type):
+    """Yields tuples ``(model_id, files)`` with all Files of each model of the given list file, see :py:meth:`ListReader.iter_model_files`.
+
+    When the lists are not stored, the files of one model at a time are selected from the SQLite file.
+    """
+    key = self._key(list_file)
+    if key is None or self.m_store_lists or list_file in self.m_encoded_lists:
+      for item in ListReader.iter_model_files(self, list_file, group, type):
+        yield item
+      return
+    model_ids = [model_id for model_id, in self.m_connection.execute("SELECT model_id FROM file WHERE protocol=? AND grp=? AND purpose=? GROUP BY model_id ORDER BY MIN(rowid)", key)]
+    for model_id in model_ids:
+      yield model_id, self._select(key, " AND model_id=?", (model_id,))
+
+
+  def read_models(self, list_file, group, type = None):
+    """Generates a dictionary from model_ids to client_ids for the given list file, if not done yet, and returns it; the models are in the order of the list"""
+    key = self._key(list_file)
+    if key is None or list_file in self.m_model_dicts:
+      return ListReader.read_models(self, list_file, group, type)
+    retval = {}
+    for model_id, client_id, client_count in self.m_connection.execute("SELECT model_id, MIN(client_id), COUNT(DISTINCT client_id) FROM file WHERE protocol=? AND grp=? AND purpose=? GROUP BY model_id ORDER BY MIN(rowid)", key):
+      if client_count > 1:
+        raise ValueError("The read model id '%s' is associated to %d different client ids!" % (model_id, client_count))
+      retval[model_id] = client_id
+    if self.m_store_lists:
+      self.m_model_dicts[list_file] = retval
+    return retval
+
+
+  def read_client_ids(self, list_file, group, type = None):
+    """Returns the set of client ids contained in the given list file."""
+    key = self._key(list_file)
+    if key is None or list_file in self.m_read_lists:
+      return ListReader.read_client_ids(self, list_file, group, type)
+    return set(client_id for client_id, in self.m_connection.execute("SELECT DISTINCT client_id FROM file WHERE protocol=? AND grp=? AND purpose=?", key))
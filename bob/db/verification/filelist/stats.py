@@ -0,0 +1,128 @@
+#!/usr/bin/env python
+# vim: set fileencoding=utf-8 :
+#
+# Copyright (C) 2011-2013 Idiap Research Institute, Martigny, Switzerland
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, version 3 of the License.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""Statistics of the file lists, which are computed by reading each list file line by line, without creating :py:class:`bob.db.verification.filelist.File` objects."""
+
+import collections
+
+from .models import _ROW
+
+ListSummary = collections.namedtuple('ListSummary', ('rows', 'models', 'clients', 'model_clients', 'genuine'))
+ListSummary.__doc__ = """The summary of a list file: the number of ``rows``, the number of rows of each model id in ``models`` and of each client id in ``clients`` (both :py:class:`collections.Counter`), the client id of each model in ``model_clients`` and the number of ``genuine`` trials, i.e., rows with identical claimed and client id."""
+
+
+def summarize_list(list_file, column_count, unique_paths = False):
+  """Reads the given list file and summarizes its content.
+
+  Keyword parameters:
+
+  list_file : str
+    The list file to summarize
+
+  column_count : int
+    The number of columns of the list (2, 3 or 4); models are counted for lists with 3 and 4 columns
+
+  unique_paths : bool
+    Only summarize the first row of each file name, which keeps all file names of the list in memory
+
+  Returns: a :py:class:`ListSummary`
+  """
+  rows = 0
+  genuine = 0
+  models = collections.Counter()
+  clients = collections.Counter()
+  model_clients = {}
+  paths = set()
+  with open(list_file, 'rb') as lines:
+    for line in lines:
+      row = _ROW.findall(line.decode('utf-8'))
+      if not row:
+        continue
+      if unique_paths:
+        if row[0] in paths:
+          continue
+        paths.add(row[0])
+      rows += 1
+      # the client id is in the last column, or identical to the model id, see ListReader._create_files
+      client_id = row[-1] if len(row) == column_count else row[1]
+      clients[client_id] += 1
+      if column_count > 2:
+        models[row[1]] += 1
+        model_clients.setdefault(row[1], client_id)
+      if column_count == 4 and row[2] == client_id:
+        genuine += 1
+  return ListSummary(rows, models, clients, model_clients, genuine)
+
+
+def protocol_statistics(database, protocol = None):
+  """Computes statistics of the lists of the given protocol, reading each list once.
+
+  Keyword parameters:
+
+  database : :py:class:`bob.db.verification.filelist.Database`
+    The database, whose lists should be summarized; its probe mode decides whether the trials are defined by the ``for_probes`` or the ``for_scores`` lists
+
+  protocol : str or ``None``
+    The protocol to consider
+
+  Returns: a dictionary from the available groups to dictionaries of statistics, which contain:
+
+  * for the training groups: the number of ``files`` and ``clients``
+  * for the ``dev`` and ``eval`` groups: the number of ``enroll_files``, ``models`` and ``clients``, the ``files_per_model`` as a tuple ``(minimum, mean, maximum)``, the number of unique ``probe_files`` (only for dense probing), ``genuine`` and ``impostor`` trials, and if available, the number of ``tnorm_models``, ``tnorm_files``, ``znorm_clients`` and ``znorm_files``
+  """
+  column_count = database.m_list_reader._column_count
+  summaries = collections.defaultdict(dict)
+  for group, type, list_file in database.list_files(protocol):
+    # as in the queries, probe files that appear several times in the for_probes list are used once
+    summaries[group][type] = summarize_list(list_file, column_count(group, type), unique_paths = type == 'for_probes')
+
+  retval = {}
+  for group, lists in summaries.items():
+    if None in lists:
+      retval[group] = {'files' : lists[None].rows, 'clients' : len(lists[None].clients)}
+      continue
+    stats = {}
+    models = lists.get('for_models')
+    if models is not None:
+      per_model = models.models.values()
+      stats.update({
+        'enroll_files' : models.rows,
+        'models' : len(models.models),
+        'clients' : len(models.clients),
+        'files_per_model' : (min(per_model), float(models.rows) / len(per_model), max(per_model)) if per_model else (0, 0., 0),
+      })
+    if database.m_use_dense_probes:
+      probes = lists.get('for_probes')
+      if probes is not None and models is not None:
+        # each probe is compared to all models; trials are genuine when the probe belongs to the client of the model
+        models_per_client = collections.Counter(models.model_clients.values())
+        stats['probe_files'] = probes.rows
+        stats['genuine'] = sum(count * models_per_client[client_id] for client_id, count in probes.clients.items())
+        stats['impostor'] = len(models.models) * probes.rows - stats['genuine']
+    else:
+      scores = lists.get('for_scores')
+      if scores is not None:
+        stats['genuine'] = scores.genuine
+        stats['impostor'] = scores.rows - scores.genuine
+    if 'for_tnorm' in lists:
+      stats['tnorm_models'] = len(lists['for_tnorm'].models)
+      stats['tnorm_files'] = lists['for_tnorm'].rows
+    if 'for_znorm' in lists:
+      stats['znorm_clients'] = len(lists['for_znorm'].clients)
+      stats['znorm_files'] = lists['for_znorm'].rows
+    retval[group] = stats
+  return retval
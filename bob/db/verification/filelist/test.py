@@ -106,7 +106,7 @@ def test_query_protocol():
   assert len(db.tobjects(groups='dev', protocol=p)) == 8 # 8 samples for enrolling T-norm models
   assert len(db.tobjects(groups='dev', model_ids='7', protocol=p)) == 4 # 4 samples for enrolling T-norm model '7'
   assert len(db.tobjects(groups='dev', model_ids='3', protocol=p)) == 0 # 0 samples for enrolling T-norm model '3' (no T-Norm model)
-  assert len(db.zobjects(groups='dev')) == 8 # 8 samples for Z-norm impostor accesses
+  assert len(db.zobjects(groups='dev', protocol=p)) == 8 # 8 samples for Z-norm impostor accesses
 
   assert db.get_client_id_from_model_id('1', protocol=p) == '1'
   assert db.get_client_id_from_model_id('3', protocol=p) == '3'
@@ -157,8 +157,863 @@ def test_multiple_extensions():
   assert raised
 
 
+def test_prefetch():
+  import threading
+  db = bob.db.verification.filelist.Database(example_dir, use_dense_probe_file_list = False, original_directory = example_dir, original_extension = ['.jpg', '.pos'], annotation_directory = example_dir, annotation_type = 'named')
+  files = [bob.db.verification.filelist.models.File("data/model4_session1_sample2", 4)] * 5
+  loaded = []
+  def loader(file_name):
+    loaded.append(threading.current_thread())
+    with open(file_name) as f:
+      return f.read()
+  result = list(db.prefetch(files, loader, read_ahead=2, workers=2, annotations=True))
+  # the data are returned in order, and read in other threads
+  assert [f for f, _, _ in result] == files
+  with open(os.path.join(example_dir, files[0].path + '.pos')) as f:
+    expected = f.read()
+  assert all(data == expected for _, data, _ in result)
+  assert all(annotations['key1'] == (20,10) for _, _, annotations in result)
+  assert threading.current_thread() not in loaded
+
+  # errors are raised for the file that could not be loaded
+  missing = bob.db.verification.filelist.models.File("data/model4_session1_sample1", 4)
+  generator = db.prefetch([files[0], missing], loader)
+  assert next(generator)[0] is files[0]
+  try:
+    next(generator)
+    raised = False
+  except IOError:
+    raised = True
+  assert raised
+
+
+def test_sample_objects():
+  import tempfile, shutil
+  temp_dir = tempfile.mkdtemp(prefix='bob_db_filelist_')
+  try:
+    list_dir = os.path.join(temp_dir, 'lists')
+    shutil.copytree(example_dir, list_dir)
+    db = bob.db.verification.filelist.Database(list_dir, use_dense_probe_file_list = False)
+    low = bob.db.verification.filelist.Database(list_dir, use_dense_probe_file_list = False, keep_read_lists_in_memory = False)
+    world = db.objects(groups='world')
+    assert sorted(f.id for f in db.sample_objects()) == sorted(f.id for f in world)
+
+    # at most two files per client, in the order of the list
+    sample = db.sample_objects(files_per_client=2, seed=1)
+    assert [f.client_id for f in sample] == ['1', '1', '2', '2']
+    assert all(world.index(a) < world.index(b) for a, b in zip(sample[0::2], sample[1::2]))
+    # the sample is deterministic, also when the lists are not kept in memory
+    assert [f.id for f in db.sample_objects(files_per_client=2, seed=1)] == [f.id for f in sample]
+    assert [f.id for f in low.sample_objects(files_per_client=2, seed=1)] == [f.id for f in sample]
+    assert os.path.exists(os.path.join(list_dir, 'norm', 'train_world.lst.idx'))
+
+    # a subset of the clients
+    sample = db.sample_objects(client_count=1, seed=3, groups=('world', 'optional_world_1'))
+    assert len(set(f.client_id for f in sample)) == 1
+    assert [f.id for f in sample] == [f.id for f in db.objects(groups=('world', 'optional_world_1')) if f.client_id == sample[0].client_id]
+    assert db.sample_objects(client_count=0) == []
+
+    # the index is updated with appended lines
+    with open(os.path.join(list_dir, 'norm', 'train_world.lst'), 'a') as f:
+      f.write("data/model3_session1_sample1 3\n")
+    assert [f.id for f in db.sample_objects() if f.client_id == '3'] == ['data/model3_session1_sample1']
+  finally:
+    shutil.rmtree(temp_dir)
+
+
+def test_objects_by_client():
+  import tempfile, shutil
+  temp_dir = tempfile.mkdtemp(prefix='bob_db_filelist_')
+  try:
+    list_dir = os.path.join(temp_dir, 'lists')
+    shutil.copytree(example_dir, list_dir)
+    for keep in (True, False):
+      db = bob.db.verification.filelist.Database(list_dir, use_dense_probe_file_list = False, keep_read_lists_in_memory = keep)
+      for groups in ('world', ('world', 'optional_world_1', 'optional_world_2')):
+        by_client = db.objects_by_client(groups=groups)
+        files = db.objects(groups=groups)
+        assert sum(len(client_files) for client_files in by_client.values()) == len(files)
+        for client_id, client_files in by_client.items():
+          assert [f.id for f in client_files] == [f.id for f in files if f.client_id == client_id]
+      # the returned lists are copies
+      by_client['1'].append(None)
+      assert None not in db.objects_by_client()['1']
+      # the client ids are taken from the index
+      for groups in ('world', 'optional_world_2', 'dev', 'eval'):
+        assert db.client_ids(groups=groups) == set(f.client_id for f in db.objects(groups=groups, purposes='enroll'))
+  finally:
+    shutil.rmtree(temp_dir)
+
+
+def test_paths():
+  db = bob.db.verification.filelist.Database(example_dir, use_dense_probe_file_list = False)
+  files = db.objects(groups='world')
+  for directory, extension in ((None, None), ('/data', '.png'), ('data/', ''), ('', '.jpg')):
+    expected = [f.make_path(directory, extension) for f in files]
+    assert db.paths(files, directory, extension) == expected
+    assert db.paths({'groups' : 'world'}, directory, extension) == expected
+  # the paths of the query results are cached
+  info = db.query_cache_info()
+  paths = db.paths({'groups' : ['world'], 'protocol' : None}, '/data', '.png')
+  assert db.query_cache_info().hits == info.hits + 1
+  paths.append('modified')
+  assert len(db.paths({'groups' : 'world'}, '/data', '.png')) == len(files)
+  assert db.paths(directory='.') == [f.make_path('.') for f in db.objects()]
+
+
+def test_lazy_import():
+  if sys.version_info < (3, 7):
+    return
+  import subprocess
+  # importing the package (or probing its attributes) does not load the query classes or heavy dependencies
+  code = "import sys, bob.db.verification.filelist as f; hasattr(f, 'unknown'); hasattr(f, 'test'); print(' '.join(sorted(sys.modules)))"
+  output = subprocess.check_output([sys.executable, '-c', code], env = dict(os.environ, PYTHONPATH = os.pathsep.join(sys.path)))
+  modules = set(output.decode().split())
+  package = 'bob.db.verification.filelist'
+  for module in ('query', 'models', 'sql', 'server', 'shared', 'federated', 'arrays', 'validate', 'stats', 'trials', 'unknown', 'test'):
+    assert package + '.' + module not in modules, module
+  for module in ('numpy', 'sqlite3', 'bob.db.verification.utils', 'multiprocessing.shared_memory', 'asyncio'):
+    assert module not in modules, module
+  # the classes and sub-modules are imported on first use
+  assert bob.db.verification.filelist.sql.compile_lists
+  assert bob.db.verification.filelist.Database is bob.db.verification.filelist.query.Database
+
+
 def test_driver_api():
   from bob.db.base.script.dbmanage import main
   assert main(('verification.filelist dumplist --list-directory=%s --self-test' % example_dir).split()) == 0
   assert main(('verification.filelist dumplist --list-directory=%s --purpose=enroll --group=dev --class=client --self-test' % example_dir).split()) == 0
   assert main(('verification.filelist checkfiles --list-directory=%s --self-test' % example_dir).split()) == 0
+
+
+def test_validate():
+  import tempfile, shutil
+  from bob.db.verification.filelist.validate import validate
+  db = bob.db.verification.filelist.Database(example_dir, use_dense_probe_file_list = False)
+  # the example probe list contains two lines twice
+  problems = validate(db)
+  assert [(p.kind, os.path.basename(p.list_file), p.line) for p in problems] == [('duplicate', 'for_probes.lst', 7), ('duplicate', 'for_probes.lst', 8)]
+
+  temp_dir = tempfile.mkdtemp(prefix='bob_db_filelist_')
+  try:
+    list_dir = os.path.join(temp_dir, 'lists')
+    shutil.copytree(example_dir, list_dir)
+    def append(list_file, line):
+      with open(os.path.join(list_dir, list_file), 'a') as f:
+        f.write(line + '\n')
+    append('dev/for_models.lst', 'data/model3_session9_sample1 3 4')
+    append('dev/for_models.lst', 'data/model3_session9_sample2')
+    append('dev/for_scores.lst', 'data/model3_session1_sample1 3 3 3')
+    append('dev/for_scores.lst', 'data/model4_session3_sample1 9 9 4')
+    append('dev/for_probes.lst', 'data/model1_session9_sample1 1')
+    append('eval/for_znorm.lst', 'data/model5_session9_sample1 5')
+    db = bob.db.verification.filelist.Database(list_dir, use_dense_probe_file_list = False)
+    # all problems are reported at once
+    kinds = sorted(p.kind for p in validate(db))
+    assert kinds == ['cohort', 'duplicate', 'duplicate', 'format', 'leakage', 'leakage', 'leakage', 'model', 'model', 'overlap'], kinds
+    kinds = sorted(p.kind for p in validate(db, duplicates = False))
+    assert kinds == ['cohort', 'format', 'leakage', 'leakage', 'leakage', 'model', 'model', 'overlap'], kinds
+
+    from bob.db.base.script.dbmanage import main
+    assert main(('verification.filelist validate --list-directory=%s --self-test' % list_dir).split()) == 1
+
+    # without a protocol, the lists of all protocols are checked
+    db = bob.db.verification.filelist.Database(temp_dir, use_dense_probe_file_list = False)
+    kinds = sorted(p.kind for p in validate(db))
+    assert kinds == ['cohort', 'duplicate', 'duplicate', 'format', 'leakage', 'leakage', 'leakage', 'model', 'model', 'overlap'], kinds
+    assert [p.kind for p in validate(db, 'unknown')] == ['missing']
+    # a directory without lists is not valid
+    empty_dir = os.path.join(temp_dir, 'empty')
+    os.mkdir(empty_dir)
+    db = bob.db.verification.filelist.Database(empty_dir, use_dense_probe_file_list = False)
+    assert [p.kind for p in validate(db)] == ['missing']
+    assert main(('verification.filelist validate --list-directory=%s --self-test' % empty_dir).split()) == 1
+  finally:
+    shutil.rmtree(temp_dir)
+
+
+def test_label_scores():
+  import tempfile, shutil
+  from bob.db.verification.filelist.scores import ScoreLabeller, label_score_file
+  db = bob.db.verification.filelist.Database(example_dir, use_dense_probe_file_list = False)
+  # objects() returns each probe file only once, so the trials are taken from the list
+  trials = db.m_list_reader.read_list(db.get_list_file('dev', 'for_scores'), 'dev', 'for_scores')
+  lines = ['%s %s %s %s 0.5\n' % (f.claimed_id, f._model_id, f.client_id, f.path) for f in trials]
+  labeller = ScoreLabeller(db, group='dev')
+  assert len(labeller) == len(trials)
+  # the last trial is missing, and one line is not defined by the protocol
+  labels = list(labeller.label(lines[:-1] + ['3 3 3 data/unknown 0.1\n']))
+  assert [l for l, _ in labels[:-1]] == ['genuine' if f.client_id == f.claimed_id else 'impostor' for f in trials[:-1]]
+  assert labels[-1][0] == 'unexpected'
+  assert list(labeller.missing()) == [(trials[-1]._model_id, trials[-1].path)]
+  assert labeller.missing_count() == 1
+  assert labeller.unexpected() == 1
+
+  # dense probing compares all probes with all models
+  db = bob.db.verification.filelist.Database(example_dir, use_dense_probe_file_list = True)
+  labeller = ScoreLabeller(db, group='dev')
+  assert len(labeller) == len(db.model_ids(groups='dev')) * len(set(f.path for f in db.objects(groups='dev', purposes='probe')))
+  labels = list(labeller.label(['3 3 data/model3_session3_sample1 0.5\n', '4 3 data/model3_session3_sample1 0.1\n', '3 3 data/model3_session3_sample1 0.5\n']))
+  # the repeated trial is unexpected
+  assert [l for l, _ in labels] == ['genuine', 'impostor', 'unexpected']
+  assert labeller.missing_count() == len(labeller) - 2
+  missing = labeller.missing()
+  assert next(missing)[0] == '3' and ('3', 'data/model3_session3_sample1') not in missing
+
+  temp_dir = tempfile.mkdtemp(prefix='bob_db_filelist_')
+  try:
+    score_file = os.path.join(temp_dir, 'scores')
+    with open(score_file, 'w') as f:
+      f.writelines(lines)
+    db = bob.db.verification.filelist.Database(example_dir, use_dense_probe_file_list = False)
+    labeller, labelled = label_score_file(db, score_file)
+    assert len(list(labelled)) == len(trials) and not list(labeller.missing()) and labeller.missing_count() == 0
+
+    from bob.db.base.script.dbmanage import main
+    assert main(('verification.filelist labelscores --list-directory=%s --score-file=%s --split --output=%s' % (example_dir, score_file, score_file)).split()) == 0
+    with open(score_file + '.genuine') as f:
+      assert len(f.readlines()) == len([t for t in trials if t.client_id == t.claimed_id])
+  finally:
+    shutil.rmtree(temp_dir)
+
+
+def test_zt_alignment():
+  import numpy
+  db = bob.db.verification.filelist.Database(example_dir, use_dense_probe_file_list = False)
+  a = db.zt_alignment(group='dev')
+  # the alignment is computed only once
+  assert db.zt_alignment(group='dev') is a
+  assert sorted(a.model_ids) == sorted(db.model_ids(groups='dev'))
+  assert [a.client_ids[c] for c in a.model_clients] == [db.get_client_id_from_model_id(m, groups='dev') for m in a.model_ids]
+  trials = db.m_list_reader.read_list(db.get_list_file('dev', 'for_scores'), 'dev', 'for_scores')
+  assert [(a.model_ids[m], a.probe_ids[p]) for m, p in zip(a.trial_models, a.trial_probes)] == [(f._model_id, f.id) for f in trials]
+  assert [a.client_ids[c] for c in a.probe_clients[a.trial_probes]] == [f.client_id for f in trials]
+  assert [a.tfiles[f] for f in a.tfile_ids] == [f.id for f in db.tobjects(groups='dev')]
+  assert [a.tmodel_ids[m] for m in a.tfile_models] == [f._model_id for f in db.tobjects(groups='dev')]
+  assert list(a.zfile_ids) == [f.id for f in db.zobjects(groups='dev')]
+  assert [a.client_ids[c] for c in a.zfile_clients] == [f.client_id for f in db.zobjects(groups='dev')]
+  assert not a.trial_models.flags.writeable
+
+  # with dense probing, all probes are compared to all models
+  db = bob.db.verification.filelist.Database(example_dir, use_dense_probe_file_list = True)
+  a = db.zt_alignment(group='eval')
+  assert len(a.trial_models) == len(a.model_ids) * len(a.probe_ids)
+  assert numpy.all(numpy.bincount(a.trial_models) == len(a.probe_ids))
+
+  # a file that is used by two T-Norm models is kept for both models
+  import tempfile, shutil
+  temp_dir = tempfile.mkdtemp(prefix='bob_db_filelist_')
+  try:
+    list_dir = os.path.join(temp_dir, 'lists')
+    shutil.copytree(example_dir, list_dir)
+    with open(os.path.join(list_dir, 'dev', 'for_tnorm.lst'), 'a') as f:
+      f.write('data/model7_session1_sample1 9 7\n')
+    db = bob.db.verification.filelist.Database(list_dir, use_dense_probe_file_list = False)
+    a = db.zt_alignment(group='dev')
+    assert len(a.tfiles) == 8 and len(a.tfile_ids) == 9
+    assert [(a.tfiles[f], a.tmodel_ids[m]) for f, m in zip(a.tfile_ids, a.tfile_models)] == [(f.id, f._model_id) for f in db.tobjects(groups='dev')]
+    assert (a.tfiles[a.tfile_ids[-1]], a.tmodel_ids[a.tfile_models[-1]]) == ('data/model7_session1_sample1', '9')
+  finally:
+    shutil.rmtree(temp_dir)
+
+
+def test_dense_trials():
+  db = bob.db.verification.filelist.Database(example_dir, use_dense_probe_file_list = True)
+  trials = db.dense_trials(group='dev', model_tile=1, probe_tile=3)
+  models = db.model_ids(groups='dev')
+  lines = db.m_list_reader.read_list(db.get_list_file('dev', 'for_probes'), 'dev', 'for_probes')
+  # the probe list contains repeated lines, which are used only once, as in objects()
+  probes = db.objects(groups='dev', purposes='probe')
+  assert len(set(f.id for f in lines)) == len(probes) < len(lines)
+  # the counts are available up front
+  assert (trials.model_count, trials.probe_count) == (len(models), len(probes))
+  assert len(trials) == len(models) * len(probes)
+  assert trials.tile_count == len(models) * ((len(probes) + 2) // 3)
+  tiles = list(trials)
+  assert len(tiles) == trials.tile_count
+  assert all(len(tile.model_ids) == 1 and len(tile.probes) <= 3 for tile in tiles)
+  # the tiles cover the full matrix of models and probes
+  pairs = [(m, f.id) for tile in tiles for m in tile.model_ids for f in tile.probes]
+  assert sorted(pairs) == sorted((m, f.id) for m in models for f in probes)
+  assert [f.id for tile in tiles[:trials.tile_count // len(models)] for f in tile.probes] == [f.id for f in probes]
+  genuine = sum(c == f.client_id for tile in tiles for c in tile.model_clients for f in tile.probes)
+  assert genuine == trials.genuine_count()
+  try:
+    db.dense_trials(group='dev', model_tile=0)
+    raised = False
+  except ValueError:
+    raised = True
+  assert raised
+
+
+def test_iter_trials():
+  import tempfile, shutil
+  temp_dir = tempfile.mkdtemp(prefix='bob_db_filelist_')
+  try:
+    # the seek index is written next to the lists
+    list_dir = os.path.join(temp_dir, 'lists')
+    shutil.copytree(example_dir, list_dir)
+    for keep in (True, False):
+      db = bob.db.verification.filelist.Database(list_dir, use_dense_probe_file_list = False, keep_read_lists_in_memory = keep)
+      list_file = db.get_list_file('dev', 'for_scores')
+      lines = bob.db.verification.filelist.models.ListReader(False).read_list(list_file, 'dev', 'for_scores')
+      chunks = list(db.iter_trials(group='dev', chunk_size=3))
+      assert all(0 < len(chunk) <= 3 for chunk in chunks)
+      trials = [(m, f.id, g) for chunk in chunks for m, f, g in chunk]
+      # each line of the list is a trial, also when the probe file is repeated
+      assert sorted(trials) == sorted((f._model_id, f.id, f.client_id == f.claimed_id) for f in lines)
+      assert len(trials) > len(db.objects(groups='dev', purposes='probe'))
+      # the trials of each model are consecutive
+      models = [m for m, _, _ in trials]
+      assert len(set(models)) == len([m for i, m in enumerate(models) if i == 0 or models[i-1] != m])
+      assert os.path.exists(list_file + '.idx') != keep
+  finally:
+    shutil.rmtree(temp_dir)
+
+
+def test_export_trials():
+  import tempfile, shutil
+  import numpy
+  db = bob.db.verification.filelist.Database(example_dir, use_dense_probe_file_list = False)
+  temp_dir = tempfile.mkdtemp(prefix='bob_db_filelist_')
+  try:
+    from bob.db.base.script.dbmanage import main
+    assert main(('verification.filelist export --list-directory=%s --output=%s --self-test' % (example_dir, temp_dir)).split()) == 0
+    def load(name):
+      return numpy.load(os.path.join(temp_dir, name + '.npy'), mmap_mode='r')
+    paths, models, clients = load('paths'), load('model_ids'), load('client_ids')
+    trials = [(models[m], paths[p], clients[c], clients[r], g) for m, p, c, r, g in zip(load('trial_model'), load('trial_probe'), load('trial_claimed'), load('trial_client'), load('trial_group'))]
+    expected = []
+    for group in ('dev', 'eval'):
+      for f in db.m_list_reader.read_list(db.get_list_file(group, 'for_scores'), group, 'for_scores'):
+        expected.append((f._model_id, f.path, f.claimed_id, f.client_id, ('dev', 'eval').index(group)))
+    assert [(m.decode(), p.decode(), c.decode(), r.decode(), g) for m, p, c, r, g in trials] == expected
+    enrolled = [(models[m].decode(), paths[p].decode()) for m, p in zip(load('enroll_model'), load('enroll_file'))]
+    assert enrolled == [(f._model_id, f.path) for f in db.objects(groups=('dev', 'eval'), purposes='enroll')]
+
+    # with dense probing, repeated probe lines are used once, as in dense_trials()
+    from bob.db.verification.filelist.arrays import trial_table
+    dense = bob.db.verification.filelist.Database(example_dir, use_dense_probe_file_list = True)
+    table = trial_table(dense, groups='dev')
+    pairs = set(zip(table['trial_model'], table['trial_probe']))
+    assert len(pairs) == len(table['trial_model']) == len(dense.dense_trials(group='dev'))
+    assert (table['trial_claimed'] == table['trial_client']).sum() == dense.dense_trials(group='dev').genuine_count()
+
+    # without NumPy, the export command fails
+    sys.modules['numpy'] = None
+    try:
+      assert main(('verification.filelist export --list-directory=%s --output=%s --self-test' % (example_dir, temp_dir)).split()) == 1
+    finally:
+      sys.modules['numpy'] = numpy
+  finally:
+    shutil.rmtree(temp_dir)
+
+
+def test_statistics():
+  from bob.db.verification.filelist.stats import protocol_statistics
+  db = bob.db.verification.filelist.Database(example_dir, use_dense_probe_file_list = False)
+  stats = protocol_statistics(db)
+  assert stats['world'] == {'files' : len(db.objects(groups='world')), 'clients' : len(db.client_ids(groups='world'))}
+  dev = stats['dev']
+  assert dev['models'] == len(db.model_ids(groups='dev'))
+  assert dev['enroll_files'] == len(db.objects(groups='dev', purposes='enroll'))
+  assert dev['files_per_model'] == (4, 4., 4)
+  trials = db.m_list_reader.read_list(db.get_list_file('dev', 'for_scores'), 'dev', 'for_scores')
+  assert dev['genuine'] == len([f for f in trials if f.client_id == f.claimed_id])
+  assert dev['genuine'] + dev['impostor'] == len(trials)
+  assert dev['tnorm_models'] == len(db.tmodel_ids(groups='dev'))
+  assert dev['znorm_files'] == len(db.zobjects(groups='dev'))
+
+  # with dense probing, all probes are compared to all models
+  db = bob.db.verification.filelist.Database(example_dir, use_dense_probe_file_list = True)
+  dev = protocol_statistics(db)['dev']
+  assert dev['genuine'] + dev['impostor'] == dev['models'] * dev['probe_files']
+  # the example probe list contains repeated lines, which are counted once, as in dense_trials()
+  trials = db.dense_trials(group='dev')
+  assert (dev['probe_files'], dev['genuine'], dev['impostor']) == (trials.probe_count, trials.genuine_count(), len(trials) - trials.genuine_count())
+
+  from bob.db.base.script.dbmanage import main
+  assert main(('verification.filelist stats --list-directory=%s --self-test' % example_dir).split()) == 0
+
+
+def test_query_cache():
+  db = bob.db.verification.filelist.Database(example_dir, use_dense_probe_file_list = False, query_cache_size = 2)
+
+  first = db.objects(groups='dev', purposes=('probe', 'enroll'))
+  assert db.query_cache_info().misses == 1
+  # the order of the parameters does not matter
+  second = db.objects(groups=['dev'], purposes=('enroll', 'probe'))
+  assert db.query_cache_info().hits == 1
+  assert [f.id for f in first] == [f.id for f in second]
+  # the returned lists can be modified without changing the cache
+  second.pop()
+  assert len(db.objects(groups='dev', purposes='enroll') + db.objects(groups='dev', purposes='probe')) == 16
+  assert len(db.objects(groups='dev', purposes=('enroll', 'probe'))) == len(first)
+
+  # the least recently used result is removed
+  info = db.query_cache_info()
+  assert info.maxsize == 2 and info.currsize == 2
+  db.tobjects(groups='dev')
+  db.zobjects(groups='dev')
+  db.objects(groups='dev', purposes=('enroll', 'probe'))
+  assert db.query_cache_info().misses == info.misses + 3
+
+  # no cache is used when the lists are not kept in memory
+  db = bob.db.verification.filelist.Database(example_dir, use_dense_probe_file_list = False, keep_read_lists_in_memory = False)
+  db.objects()
+  db.objects()
+  assert db.query_cache_info().hits == 0
+
+
+def test_appended_lists():
+  import tempfile, shutil
+  temp_dir = tempfile.mkdtemp(prefix='bob_db_filelist_')
+  try:
+    list_dir = os.path.join(temp_dir, 'lists')
+    shutil.copytree(example_dir, list_dir)
+    db = bob.db.verification.filelist.Database(list_dir, use_dense_probe_file_list = False)
+    assert len(db.objects(groups='dev', purposes='enroll')) == 8
+    assert sorted(db.model_ids(groups='dev')) == ['3', '4']
+    model_list = os.path.join(list_dir, 'dev', 'for_models.lst')
+    offset = db.m_list_reader.m_list_states[model_list].offset
+    assert offset == os.path.getsize(model_list)
+
+    # append a new model, where the last line is not terminated
+    with open(model_list, 'a') as f:
+      f.write("data/model5_session1_sample1 5 5")
+    assert len(db.objects(groups='dev', purposes='enroll')) == 9
+    # the unterminated line is parsed again, but the lines before are not
+    assert db.m_list_reader.m_list_states[model_list].offset == offset
+    with open(model_list, 'a') as f:
+      f.write("\ndata/model5_session1_sample2 5 5\n")
+    files = db.objects(groups='dev', purposes='enroll')
+    assert len(files) == 10
+    assert files[-1].path == 'data/model5_session1_sample2'
+    assert sorted(db.model_ids(groups='dev')) == ['3', '4', '5']
+    assert db.get_client_id_from_model_id('5', groups='dev') == '5'
+    assert db.m_list_reader.m_list_states[model_list].offset == os.path.getsize(model_list)
+
+    # other modifications lead to parsing the whole file again
+    with open(model_list) as f:
+      lines = f.readlines()
+    with open(model_list, 'w') as f:
+      f.writelines(lines[2:])
+    assert len(db.objects(groups='dev', purposes='enroll')) == 8
+
+    # only the lists of a query are checked; cached lists of other protocols, whose files were removed, are dropped
+    db = bob.db.verification.filelist.Database(temp_dir, use_dense_probe_file_list = False)
+    for protocol in ('lists', 'other'):
+      if protocol == 'other':
+        shutil.copytree(list_dir, os.path.join(temp_dir, protocol))
+      assert len(db.objects(protocol=protocol, groups='world')) == 8
+    other_list = db.get_list_file('world', protocol='other')
+    assert other_list in db.m_list_reader.m_read_lists
+    shutil.rmtree(os.path.join(temp_dir, 'other'))
+    assert len(db.objects(protocol='lists', groups='world')) == 8
+    assert other_list in db.m_list_reader.m_read_lists
+    assert db.m_list_reader.refresh()
+    assert other_list not in db.m_list_reader.m_read_lists
+    assert len(db.objects(protocol='lists', groups='world')) == 8
+  finally:
+    shutil.rmtree(temp_dir)
+
+
+def test_fingerprint():
+  import tempfile, shutil
+  temp_dir = tempfile.mkdtemp(prefix='bob_db_filelist_')
+  try:
+    list_dir = os.path.join(temp_dir, 'lists')
+    shutil.copytree(example_dir, list_dir)
+    db = bob.db.verification.filelist.Database(list_dir, use_dense_probe_file_list = False)
+    low = bob.db.verification.filelist.Database(list_dir, use_dense_probe_file_list = False, keep_read_lists_in_memory = False)
+    fingerprint = db.fingerprint()
+    world = db.fingerprint(groups='world')
+    assert low.fingerprint() == fingerprint
+    assert world != fingerprint
+    # the content of the lists is the same in another directory
+    assert bob.db.verification.filelist.Database(example_dir, use_dense_probe_file_list = False).fingerprint() == fingerprint
+
+    # changing only the layout of a list does not change the fingerprint
+    model_list = os.path.join(list_dir, 'dev', 'for_models.lst')
+    with open(model_list) as f:
+      lines = f.readlines()
+    with open(model_list, 'w') as f:
+      f.write(''.join(line.replace(' ', '   ') for line in lines))
+    assert db.fingerprint() == fingerprint
+    assert low.fingerprint() == fingerprint
+
+    # appended lines change the fingerprint of the groups that contain the list
+    with open(model_list, 'a') as f:
+      f.write("data/model5_session1_sample1 5 5")
+    appended = db.fingerprint()
+    assert appended != fingerprint
+    assert db.fingerprint(groups='world') == world
+    assert low.fingerprint() == appended
+    assert bob.db.verification.filelist.Database(list_dir, use_dense_probe_file_list = False).fingerprint() == appended
+    # the last line is completed
+    with open(model_list, 'a') as f:
+      f.write("1\n")
+    assert db.fingerprint() not in (fingerprint, appended)
+    assert db.fingerprint() == bob.db.verification.filelist.Database(list_dir, use_dense_probe_file_list = False).fingerprint()
+  finally:
+    shutil.rmtree(temp_dir)
+
+
+def test_seek_index():
+  import tempfile, shutil
+  temp_dir = tempfile.mkdtemp(prefix='bob_db_filelist_')
+  try:
+    list_dir = os.path.join(temp_dir, 'lists')
+    shutil.copytree(example_dir, list_dir)
+    db = bob.db.verification.filelist.Database(list_dir, use_dense_probe_file_list = False)
+    low = bob.db.verification.filelist.Database(list_dir, use_dense_probe_file_list = False, keep_read_lists_in_memory = False)
+    model_list = os.path.join(list_dir, 'dev', 'for_models.lst')
+
+    # the files of the models are read from the indexed byte ranges
+    for model_ids in ('3', ('4', '3'), 'unknown'):
+      assert [f.id for f in low.objects(groups='dev', model_ids=model_ids)] == [f.id for f in db.objects(groups='dev', model_ids=model_ids)]
+      assert [f.id for f in low.tobjects(groups='dev', model_ids=model_ids)] == [f.id for f in db.tobjects(groups='dev', model_ids=model_ids)]
+    assert os.path.exists(model_list + '.idx')
+    assert os.path.exists(os.path.join(list_dir, 'dev', 'for_scores.lst.idx'))
+    assert low.model_ids(groups='dev') == db.model_ids(groups='dev')
+    assert low.get_client_id_from_model_id('3', groups='dev') == '3'
+
+    # the sidecar file is used by other databases, and renewed when the list changes
+    with open(model_list, 'a') as f:
+      f.write("data/model5_session1_sample1 5 5\n")
+    low = bob.db.verification.filelist.Database(list_dir, use_dense_probe_file_list = False, keep_read_lists_in_memory = False)
+    assert [f.path for f in low.objects(groups='dev', purposes='enroll', model_ids='5')] == ['data/model5_session1_sample1']
+    assert '5' in low.model_ids(groups='dev')
+  finally:
+    shutil.rmtree(temp_dir)
+
+
+def test_parallel_parsing():
+  import tempfile, shutil
+  db = bob.db.verification.filelist.Database(example_dir, use_dense_probe_file_list = False)
+  # all lists are parsed in parallel
+  parallel = bob.db.verification.filelist.Database(example_dir, use_dense_probe_file_list = False, parallel_parsing_threshold = 1, parallel_parsing_workers = 2)
+  for group, type, list_file in db.list_files():
+    assert [(f.id, f._model_id, f.claimed_id, f.client_id) for f in parallel.m_list_reader.read_list(list_file, group, type)] == \
+        [(f.id, f._model_id, f.claimed_id, f.client_id) for f in db.m_list_reader.read_list(list_file, group, type)]
+
+  temp_dir = tempfile.mkdtemp(prefix='bob_db_filelist_')
+  try:
+    list_dir = os.path.join(temp_dir, 'lists')
+    shutil.copytree(example_dir, list_dir)
+    model_list = os.path.join(list_dir, 'dev', 'for_models.lst')
+    with open(model_list, 'a') as f:
+      f.write("data/model5_session1_sample1 5 5")
+    parallel = bob.db.verification.filelist.Database(list_dir, use_dense_probe_file_list = False, parallel_parsing_threshold = 1, parallel_parsing_workers = 2)
+    assert len(parallel.objects(groups='dev', purposes='enroll')) == 9
+    # appended lines are still parsed incrementally
+    with open(model_list, 'a') as f:
+      f.write("\ndata/model5_session1_sample2 5 5\n")
+    assert len(parallel.objects(groups='dev', purposes='enroll')) == 10
+    assert parallel.m_list_reader.m_list_states[model_list].offset == os.path.getsize(model_list)
+
+    # the consistency of the lines is checked across the parallel parts
+    with open(model_list, 'a') as f:
+      f.write("data/model6_session1_sample1 6\n")
+    parallel = bob.db.verification.filelist.Database(list_dir, use_dense_probe_file_list = False, parallel_parsing_threshold = 1, parallel_parsing_workers = 2)
+    try:
+      parallel.objects(groups='dev', purposes='enroll')
+      assert False, "The inconsistent line has not been detected"
+    except RuntimeError:
+      pass
+  finally:
+    shutil.rmtree(temp_dir)
+
+
+def test_federated():
+  import tempfile, shutil
+  temp_dir = tempfile.mkdtemp(prefix='bob_db_filelist_')
+  try:
+    # a second source with a protocol that contains an additional model and a file of the first source
+    protocol_dir = os.path.join(temp_dir, 'P')
+    shutil.copytree(example_dir, protocol_dir)
+    with open(os.path.join(protocol_dir, 'dev', 'for_models.lst'), 'w') as f:
+      f.write("data/model3_session1_sample1 3 3\ndata/model7_session1_sample1 7 7\n")
+    db = bob.db.verification.filelist.Database(example_dir, use_dense_probe_file_list = False)
+    second = bob.db.verification.filelist.Database(temp_dir, use_dense_probe_file_list = False)
+    federated = bob.db.verification.filelist.FederatedDatabase([example_dir, temp_dir], use_dense_probe_file_list = False)
+
+    # only the second source contains the protocol, so the first one is not loaded
+    assert sorted(federated.model_ids(protocol='P', groups='dev')) == ['3', '7']
+    assert federated.m_databases[0] is None
+    assert federated.get_client_id_from_model_id('7', groups='dev', protocol='P') == '7'
+
+    # files are merged by their id
+    files = federated.objects(groups='dev', purposes='enroll')
+    assert [f.id for f in files] == [f.id for f in db.objects(groups='dev', purposes='enroll')]
+    enroll = db.objects(groups='dev', purposes='enroll') + second.objects(protocol='P', groups='dev', purposes='enroll')
+    assert len(set(f.id for f in enroll)) == len(enroll) - 1
+    assert federated.client_ids() == db.client_ids()
+    assert [f.id for f in federated.zobjects(groups='dev')] == [f.id for f in db.zobjects(groups='dev')]
+    assert federated.groups() == db.groups()
+
+    # T-Norm and Z-Norm files are concatenated, as a single database returns files of several T-Norm models
+    with open(os.path.join(protocol_dir, 'dev', 'for_tnorm.lst'), 'a') as f:
+      f.write("data/model7_session1_sample1 9 7\n")
+    single = bob.db.verification.filelist.FederatedDatabase([temp_dir], use_dense_probe_file_list = False)
+    tfiles = second.tobjects(protocol='P', groups='dev')
+    assert [(f.id, f._model_id) for f in single.tobjects(protocol='P', groups='dev')] == [(f.id, f._model_id) for f in tfiles]
+    assert len(set(f.id for f in tfiles)) == len(tfiles) - 1
+    assert len(federated.tobjects(protocol='P', groups='dev')) == len(tfiles)
+    assert len(federated.zobjects(groups='dev')) == len(db.zobjects(groups='dev'))
+  finally:
+    shutil.rmtree(temp_dir)
+
+
+def test_protocol_catalog():
+  import tempfile, shutil
+  temp_dir = tempfile.mkdtemp(prefix='bob_db_filelist_')
+  try:
+    for protocol in ('P1', 'P2'):
+      shutil.copytree(example_dir, os.path.join(temp_dir, protocol))
+    os.mkdir(os.path.join(temp_dir, 'empty'))
+    db = bob.db.verification.filelist.Database(temp_dir, use_dense_probe_file_list = False)
+    assert db.protocols() == ['P1', 'P2']
+
+    catalog = db.protocol_catalog()
+    assert sorted(catalog) == ['P1', 'P2']
+    p1 = catalog['P1']
+    assert sorted(p1['groups']) == sorted(db.groups('P1'))
+    assert p1['probe_mode'] == 'both'
+    assert p1['zt_groups'] == ['dev', 'eval']
+    assert p1['models']['dev'] == len(db.model_ids(protocol='P1', groups='dev'))
+    assert p1['clients']['world'] == len(db.client_ids(protocol='P1', groups='world'))
+    assert p1['rows']['dev']['for_models'] == len(db.objects(protocol='P1', groups='dev', purposes='enroll'))
+
+    # other databases use the manifest file, which is only updated for changed protocols
+    manifest_file = os.path.join(temp_dir, '.protocol_catalog.json')
+    assert os.path.exists(manifest_file)
+    with open(os.path.join(temp_dir, 'P2', 'dev', 'for_models.lst'), 'a') as f:
+      f.write("data/model5_session1_sample1 5 5\n")
+    import bob.db.verification.filelist.catalog as catalog_module
+    describe = catalog_module._describe
+    described = []
+    catalog_module._describe = lambda database, protocol: described.append(protocol) or describe(database, protocol)
+    try:
+      catalog = bob.db.verification.filelist.Database(temp_dir, use_dense_probe_file_list = False).protocol_catalog()
+    finally:
+      catalog_module._describe = describe
+    assert described == ['P2']
+    assert catalog['P1'] == p1
+    assert catalog['P2']['models']['dev'] == p1['models']['dev'] + 1
+  finally:
+    shutil.rmtree(temp_dir)
+
+
+def test_threads():
+  import threading, time, concurrent.futures
+  db = bob.db.verification.filelist.Database(example_dir, use_dense_probe_file_list = False)
+  reader = db.m_list_reader
+  parsed = []
+  read_column_list = reader._read_column_list
+  def slow_read_column_list(list_file, column_count, state = None):
+    parsed.append(list_file)
+    # give the other threads the chance to read the same list
+    time.sleep(0.05)
+    return read_column_list(list_file, column_count, state)
+  reader._read_column_list = slow_read_column_list
+
+  barrier = threading.Barrier(8)
+  def query(index):
+    barrier.wait()
+    return [f.id for f in db.objects(groups='world')], sorted(db.model_ids(groups='dev')), db.client_ids(groups='world')
+  with concurrent.futures.ThreadPoolExecutor(8) as pool:
+    results = list(pool.map(query, range(8)))
+  # all threads got the same result, but each list was parsed only once
+  assert all(result == results[0] for result in results)
+  assert sorted(parsed) == sorted(set(parsed))
+  assert len(parsed) == 2
+  assert db.query_cache_info().hits + db.query_cache_info().misses == 8
+
+  # queries of warm lists do not wait for the locks of the lists or of the query cache
+  list_lock = reader._list_lock(db.get_list_file('world'))
+  with list_lock, db.m_query_cache.m_lock:
+    barrier = threading.Barrier(1)
+    thread = threading.Thread(target = query, args = (0,))
+    thread.start()
+    thread.join(5)
+    assert not thread.is_alive()
+
+  # the reader can still be pickled
+  import pickle
+  assert pickle.loads(pickle.dumps(reader.__class__(True))).read_list(db.get_list_file('world'), 'world')
+
+
+def test_shared_list_store():
+  if sys.version_info < (3, 8):
+    # shared memory requires Python 3.8
+    return
+  from bob.db.verification.filelist.shared import SharedListStore
+  db = bob.db.verification.filelist.Database(example_dir, use_dense_probe_file_list = False)
+  with SharedListStore(db) as store:
+    # the worker database reads all lists from the shared memory segment
+    worker = bob.db.verification.filelist.Database(example_dir, use_dense_probe_file_list = False, shared_list_store = store.name)
+    assert set(worker.m_list_reader.m_encoded_lists) == set(l[2] for l in db.list_files())
+    for query in ('objects', 'tobjects', 'zobjects'):
+      expected = [(f.id, f.client_id, f._model_id, f.claimed_id) for f in getattr(db, query)()]
+      assert [(f.id, f.client_id, f._model_id, f.claimed_id) for f in getattr(worker, query)()] == expected
+    assert sorted(worker.model_ids()) == sorted(db.model_ids())
+    assert worker.get_client_id_from_tmodel_id('7') == '7'
+    worker.m_shared_list_store.close()
+
+    # processes that attach to the store do not remove the segment when they end
+    import subprocess
+    code = "import bob.db.verification.filelist as f; print(len(f.Database(%r, use_dense_probe_file_list = False, shared_list_store = %r).objects()))" % (example_dir, store.name)
+    for i in range(2):
+      output = subprocess.check_output([sys.executable, '-c', code], env = dict(os.environ, PYTHONPATH = os.pathsep.join(sys.path)), stderr = subprocess.STDOUT)
+      assert output.decode().strip() == str(len(db.objects()))
+
+
+def test_pickle():
+  import pickle
+  db = bob.db.verification.filelist.Database(example_dir, use_dense_probe_file_list = False)
+  files = db.objects()
+  assert isinstance(files, bob.db.verification.filelist.FileList)
+
+  # query results are restored as lists of files
+  restored = pickle.loads(pickle.dumps(files))
+  assert isinstance(restored, bob.db.verification.filelist.FileList)
+  assert [(f.id, f.path, f.client_id, f._model_id, f.claimed_id) for f in restored] == [(f.id, f.path, f.client_id, f._model_id, f.claimed_id) for f in files]
+  # without memoryview.cast() (Python < 3.3), the integer columns are copied
+  from bob.db.verification.filelist import columnar
+  columnar._CAST = False
+  try:
+    restored = pickle.loads(pickle.dumps(files))
+  finally:
+    columnar._CAST = True
+  assert [(f.id, f.path, f.client_id, f._model_id, f.claimed_id) for f in restored] == [(f.id, f.path, f.client_id, f._model_id, f.claimed_id) for f in files]
+
+  # modified results are pickled as usual lists
+  files.append('not a file')
+  restored = pickle.loads(pickle.dumps(files))
+  assert isinstance(restored, bob.db.verification.filelist.FileList)
+  assert restored[-1] == 'not a file' and [f.id for f in restored[:-1]] == [f.id for f in files[:-1]]
+  files.pop()
+
+  # the lists of a warm database are only decoded when they are used
+  restored = pickle.loads(pickle.dumps(db))
+  assert not restored.m_list_reader.m_read_lists
+  assert len(restored.m_list_reader.m_encoded_lists) == len(db.m_list_reader.m_read_lists)
+  assert [f.id for f in restored.objects()] == [f.id for f in files]
+  assert len(restored.tobjects(groups='dev', model_ids='7')) == 4
+
+
+def test_sqlite():
+  import tempfile, shutil
+  temp_dir = tempfile.mkdtemp(prefix='bob_db_filelist_')
+  try:
+    sqlite_file = os.path.join(temp_dir, 'lists.sql3')
+    from bob.db.base.script.dbmanage import main
+    assert main(('verification.filelist compile --list-directory=%s --output=%s --self-test' % (example_dir, sqlite_file)).split()) == 0
+
+    text = bob.db.verification.filelist.Database(example_dir, use_dense_probe_file_list = False)
+    for keep in (True, False):
+      db = bob.db.verification.filelist.Database(example_dir, use_dense_probe_file_list = False, sqlite_file = sqlite_file, keep_read_lists_in_memory = keep)
+      for kwargs in ({}, {'groups' : 'world'}, {'groups' : 'dev', 'purposes' : 'probe', 'classes' : 'impostor'}, {'model_ids' : ('3', '6')}):
+        assert [f.id for f in db.objects(**kwargs)] == [f.id for f in text.objects(**kwargs)]
+      assert [f.id for f in db.tobjects(model_ids='7')] == [f.id for f in text.tobjects(model_ids='7')]
+      assert [f.id for f in db.zobjects()] == [f.id for f in text.zobjects()]
+      assert sorted(db.model_ids()) == sorted(text.model_ids())
+      assert sorted(db.tmodel_ids(groups='eval')) == sorted(text.tmodel_ids(groups='eval'))
+      assert db.client_ids() == text.client_ids()
+      assert db.zclient_ids() == text.zclient_ids()
+      assert db.get_client_id_from_model_id('6') == '6'
+
+    # without protocols, the lists of all protocols are compiled
+    list_dir = os.path.join(temp_dir, 'lists')
+    shutil.copytree(example_dir, os.path.join(list_dir, 'P'))
+    text = bob.db.verification.filelist.Database(list_dir, use_dense_probe_file_list = False)
+    from bob.db.verification.filelist.sql import compile_lists
+    assert compile_lists(text, sqlite_file) == len(text.list_files('P'))
+    db = bob.db.verification.filelist.Database(list_dir, use_dense_probe_file_list = False, sqlite_file = sqlite_file, keep_read_lists_in_memory = False)
+    # the models are in the order of the list
+    model_list = db.get_list_file('dev', 'for_models', 'P')
+    assert list(db.m_list_reader.read_models(model_list, 'dev', 'for_models')) == list(text.m_list_reader.read_models(model_list, 'dev', 'for_models'))
+    # many model ids are queried in chunks, and the trials of each model are selected, without reading the list files
+    model_ids = ['%d' % i for i in range(1000)]
+    assert [f.id for f in db.objects(protocol='P', model_ids=model_ids)] == [f.id for f in text.objects(protocol='P', model_ids=model_ids)]
+    assert [f.id for f in db.tobjects(protocol='P', model_ids=model_ids)] == [f.id for f in text.tobjects(protocol='P', model_ids=model_ids)]
+    assert [[(m, p.id) for m, p, _ in chunk] for chunk in db.iter_trials('P', chunk_size=3)] == [[(m, p.id) for m, p, _ in chunk] for chunk in text.iter_trials('P', chunk_size=3)]
+    assert [f.id for f in db.sample_objects('P', client_count=1)] == [f.id for f in text.sample_objects('P', client_count=1)]
+    assert not [name for _, _, names in os.walk(list_dir) for name in names if name.endswith('.idx')]
+  finally:
+    shutil.rmtree(temp_dir)
+
+
+def test_asyncio():
+  if sys.version_info < (3, 7):
+    # the asynchronous interface requires Python 3.7; the coroutines are run without the async syntax, so that this module can be imported by older versions
+    return
+  import asyncio
+  db = bob.db.verification.filelist.Database(example_dir, use_dense_probe_file_list = False, annotation_directory = example_dir, annotation_type = 'named')
+
+  loop = asyncio.new_event_loop()
+  try:
+    # concurrent queries share the lists that they read
+    tasks = [loop.create_task(coroutine) for coroutine in (db.aobjects(groups='dev'), db.aobjects(groups='dev', purposes='probe', classes='impostor'), db.apreload())]
+    loop.run_until_complete(asyncio.wait(tasks))
+    results = [task.result() for task in tasks]
+    assert not db.m_pending_lists
+    files = [o for o in results[0] if o.path == "data/model4_session1_sample2"]
+    annotations = loop.run_until_complete(db.aannotations_batch(files * 2))
+  finally:
+    loop.close()
+  assert [f.id for f in results[0]] == [f.id for f in db.objects(groups='dev')]
+  assert len(results[1]) == 4
+  assert len(annotations) == 2 and annotations[0]['key1'] == (20,10)
+  # all lists are now in the cache of the synchronous interface
+  assert len(db.m_list_reader.m_read_lists) == len(db.list_files())
+
+
+def test_query_server():
+  import tempfile, shutil, threading
+  from bob.db.verification.filelist.server import create_server
+  temp_dir = tempfile.mkdtemp(prefix='bob_db_filelist_')
+  try:
+    socket_path = os.path.join(temp_dir, 'query.socket')
+    db = bob.db.verification.filelist.Database(example_dir, use_dense_probe_file_list = False)
+    server = create_server(db, socket_path)
+    thread = threading.Thread(target = server.serve_forever)
+    thread.start()
+
+    client = bob.db.verification.filelist.Database(example_dir, query_server = socket_path)
+    assert not client.m_use_dense_probes
+    assert [f.id for f in client.objects(groups='dev', purposes='probe', classes='impostor')] == [f.id for f in db.objects(groups='dev', purposes='probe', classes='impostor')]
+    assert [f._model_id for f in client.tobjects(model_ids=set(['7']))] == ['7'] * 8
+    assert len(client.zobjects(groups='eval')) == 8
+    assert sorted(client.model_ids()) == sorted(db.model_ids())
+    assert client.client_ids(groups='world') == db.client_ids(groups='world')
+    try:
+      client.objects(groups='unknown')
+      raised = False
+    except ValueError:
+      raised = True
+    assert raised
+
+    # threads that share the client receive their own responses
+    queries = [('objects', {'groups' : 'dev'}), ('zobjects', {'groups' : 'eval'}), ('model_ids', {}), ('objects', {'groups' : 'world'})]
+    expected = [sorted(f.id for f in getattr(db, method)(**kwargs)) if method != 'model_ids' else sorted(db.model_ids()) for method, kwargs in queries]
+    errors = []
+    def run(index):
+      method, kwargs = queries[index % len(queries)]
+      for _ in range(20):
+        result = getattr(client, method)(**kwargs)
+        if sorted(f.id if method != 'model_ids' else f for f in result) != expected[index % len(queries)]:
+          errors.append(index)
+    threads = [threading.Thread(target = run, args = (i,)) for i in range(8)]
+    for t in threads:
+      t.start()
+    for t in threads:
+      t.join()
+    assert not errors
+    client.m_query_client.close()
+    server.shutdown()
+    server.server_close()
+    assert not os.path.exists(socket_path)
+  finally:
+    shutil.rmtree(temp_dir)
@@ -0,0 +1,116 @@
+#!/usr/bin/env python
+# vim: set fileencoding=utf-8 :
+#
+# Copyright (C) 2011-2013 Idiap Research Institute, Martigny, Switzerland
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, version 3 of the License.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""Enumeration of the trials of a protocol, without building the list of all trials in memory."""
+
+import collections
+
+TrialTile = collections.namedtuple('TrialTile', ('model_ids', 'model_clients', 'probes'))
+TrialTile.__doc__ = """A block of dense trials: all ``model_ids`` (with the client ids ``model_clients``) are compared to all ``probes``, which are :py:class:`bob.db.verification.filelist.File` objects."""
+
+
+class DenseTrials:
+  """The trials of dense probing, i.e., all models of the ``for_models`` list compared to all probe files of the ``for_probes`` list, in blocks of models and probes.
+
+  The lists are read when this object is created; the trials themselves are never stored.
+  As in :py:meth:`bob.db.verification.filelist.Database.objects`, probe files that appear several times in the ``for_probes`` list are used only once.
+  Iterating yields :py:class:`TrialTile` objects in row-major order: the first block of models with all blocks of probes, then the second block of models, and so on.
+
+  Keyword parameters:
+
+  database : :py:class:`bob.db.verification.filelist.Database`
+    The database that defines the trials
+
+  protocol : str or ``None``
+    The protocol to consider
+
+  group : str
+    The group to consider ("dev" or "eval")
+
+  model_tile : int
+    The maximum number of models in each block
+
+  probe_tile : int
+    The maximum number of probe files in each block
+  """
+
+  def __init__(self, database, protocol = None, group = 'dev', model_tile = 64, probe_tile = 1024):
+    assert group in ('dev', 'eval')
+    if model_tile < 1 or probe_tile < 1:
+      raise ValueError("The tile sizes must be positive, not %d and %d" % (model_tile, probe_tile))
+    reader = database.m_list_reader
+    models = reader.read_models(database.get_list_file(group, 'for_models', protocol), group, 'for_models')
+    self.m_model_ids = list(models)
+    self.m_model_clients = [models[model_id] for model_id in self.m_model_ids]
+    # each probe file is used once, in the order of its first appearance
+    probe_ids = set()
+    self.m_probes = []
+    for file in reader.read_list(database.get_list_file(group, 'for_probes', protocol), group, 'for_probes'):
+      if file.id not in probe_ids:
+        probe_ids.add(file.id)
+        self.m_probes.append(file)
+    self.m_model_tile = model_tile
+    self.m_probe_tile = probe_tile
+
+
+  @property
+  def model_count(self):
+    """The number of models."""
+    return len(self.m_model_ids)
+
+  @property
+  def probe_count(self):
+    """The number of probe files."""
+    return len(self.m_probes)
+
+  @property
+  def tile_count(self):
+    """The number of blocks that are yielded."""
+    return -(-self.model_count // self.m_model_tile) * -(-self.probe_count // self.m_probe_tile)
+
+  def __len__(self):
+    """The number of trials, i.e., the number of models times the number of probe files."""
+    return self.model_count * self.probe_count
+
+  def genuine_count(self):
+    """Returns the number of genuine trials, i.e., the trials whose probe file belongs to the client of the model."""
+    models_per_client = collections.Counter(self.m_model_clients)
+    return sum(models_per_client[file.client_id] for file in self.m_probes)
+
+
+  def __iter__(self):
+    for m in range(0, self.model_count, self.m_model_tile):
+      model_ids = self.m_model_ids[m : m + self.m_model_tile]
+      model_clients = self.m_model_clients[m : m + self.m_model_tile]
+      for p in range(0, self.probe_count, self.m_probe_tile):
+        yield TrialTile(model_ids, model_clients, self.m_probes[p : p + self.m_probe_tile])
+
+
+def iter_trials(database, protocol = None, group = 'dev', chunk_size = 1024):
+  """Yields the trials of the ``for_scores`` list of the given protocol and group in chunks, see :py:meth:`bob.db.verification.filelist.Database.iter_trials`."""
+  assert group in ('dev', 'eval')
+  if chunk_size < 1:
+    raise ValueError("The chunk size must be positive, not %d" % chunk_size)
+  chunk = []
+  for model_id, files in database.m_list_reader.iter_model_files(database.get_list_file(group, 'for_scores', protocol), group, 'for_scores'):
+    for file in files:
+      chunk.append((model_id, file, file.client_id == file.claimed_id))
+      if len(chunk) == chunk_size:
+        yield chunk
+        chunk = []
+  if chunk:
+    yield chunk
@@ -0,0 +1,224 @@
+#!/usr/bin/env python
+# vim: set fileencoding=utf-8 :
+#
+# Copyright (C) 2011-2013 Idiap Research Institute, Martigny, Switzerland
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, version 3 of the License.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""Validation of the file lists of a protocol.
+
+Use :py:func:`validate` (or the ``validate`` command of ``bob_dbmanage.py``) to check all lists of a protocol in a single pass.
+Each list file is read line by line; only the ids of the models and clients, the enrollment files and a hash of each line are kept in memory.
+The hashes of the lines are used to find duplicate lines; they require about 70 bytes per line of the longest list, and they are not kept when duplicates are not checked.
+"""
+
+import collections
+
+from .models import ListReader, _ROW
+
+Problem = collections.namedtuple('Problem', ('kind', 'list_file', 'line', 'message'))
+Problem.__doc__ = """A problem found in the file lists.
+
+The ``kind`` is one of :py:data:`KINDS`, ``line`` is the line number in the ``list_file`` (starting with 1), or ``None`` if the problem concerns several lists.
+"""
+
+# the kinds of problems that are reported
+KINDS = (
+  'format',    # lines that cannot be parsed, or have the wrong number of columns
+  'model',     # models associated to different clients, and scores for unknown models
+  'duplicate', # lines that appear several times in a list
+  'overlap',   # files used for both enrollment and probing
+  'leakage',   # clients that appear in several of the world, dev and eval groups
+  'cohort',    # clients that appear in the T-Norm and the Z-Norm cohorts, or in a cohort and the enrollment or probe lists
+  'missing',   # protocols without any file list
+)
+
+# the number of ids that are listed in the message of a problem
+_MAX_IDS = 10
+
+
+def _format_ids(ids):
+  ids = sorted(ids)
+  return ', '.join("'%s'" % i for i in ids[:_MAX_IDS]) + (', ...' if len(ids) > _MAX_IDS else '')
+
+
+class _Validator:
+  """Collects the problems and the ids of the lists of one protocol."""
+
+  def __init__(self, column_count, duplicates):
+    self.m_column_count = column_count
+    self.m_duplicates = duplicates
+    self.m_problems = []
+
+
+  def report(self, kind, list_file, line, message):
+    self.m_problems.append(Problem(kind, list_file, line, message))
+
+
+  def rows(self, list_file, group, type):
+    """Iterates over ``(line number, path, model id, claimed id, client id)`` of the valid lines of the given list, reporting malformed and duplicate lines."""
+    column_count = self.m_column_count(group, type)
+    # the number of entries that are accepted for each column count, see ListReader._create_files
+    valid = {2 : (2,), 3 : (2, 3), 4 : (3, 4)}[column_count]
+    first_length = None
+    # hashes of the read lines, which is sufficient to detect duplicates
+    seen = set()
+    with open(list_file, 'rb') as lines:
+      for number, line in enumerate(lines, 1):
+        row = _ROW.findall(line.decode('utf-8', 'replace'))
+        if not row:
+          continue
+        length = len(row)
+        if length not in valid:
+          self.report('format', list_file, number, "The line has %d entries, but %s are expected" % (length, ' or '.join(str(v) for v in valid)))
+          continue
+        if first_length is None:
+          first_length = length
+        elif length != first_length:
+          self.report('format', list_file, number, "The line has %d entries, but the first line has %d" % (length, first_length))
+          continue
+        if self.m_duplicates:
+          key = hash(tuple(row))
+          if key in seen:
+            self.report('duplicate', list_file, number, "The line '%s' appeared before" % ' '.join(row))
+            continue
+          seen.add(key)
+
+        if column_count == 2:
+          yield number, row[0], None, None, row[1]
+        elif column_count == 3:
+          yield number, row[0], row[1], None, row[-1]
+        else:
+          yield number, row[0], row[1], row[2], row[-1]
+
+
+  def models(self, list_file, group, type):
+    """Reads the model ids of the given list and reports models with different clients.
+
+    Returns: the dictionary from model ids to client ids, and the set of file names
+    """
+    models = {}
+    paths = set()
+    for number, path, model_id, _, client_id in self.rows(list_file, group, type):
+      paths.add(path)
+      known = models.setdefault(model_id, client_id)
+      if known != client_id:
+        self.report('model', list_file, number, "The model '%s' is associated to client '%s', but before to client '%s'" % (model_id, client_id, known))
+    return models, paths
+
+
+  def overlap(self, kind, list_file, first, second, message):
+    """Reports the ids contained in both sets."""
+    common = first & second
+    if common:
+      self.report(kind, list_file, None, message % (len(common), _format_ids(common)))
+
+
+def validate(database, protocol = None, duplicates = True):
+  """Checks all file lists of the given protocol and returns all problems found.
+
+  Next to the checks that are performed when reading the lists (see :py:class:`bob.db.verification.filelist.Database`), the following problems are reported:
+
+  * lines that appear more than once in a list
+  * files that are used for enrollment and for probing
+  * models in the scores list that are not enrolled, or that claim a different client than enrolled
+  * clients that are contained in more than one of the world, the development and the evaluation groups
+  * clients that are contained in the T-Norm and in the Z-Norm cohort, or in a cohort and in the enrollment or probe lists
+  * protocols without any file list
+
+  Keyword parameters:
+
+  database : :py:class:`bob.db.verification.filelist.Database`
+    The database, whose lists should be checked
+
+  protocol : str or ``None``
+    The protocol to check; if ``None``, the lists of the base directory and of all :py:meth:`bob.db.verification.filelist.Database.protocols` are checked
+
+  duplicates : bool
+    Check for duplicate lines; this keeps a hash of each line of a list in memory
+
+  Returns: a list of :py:class:`Problem`, which is empty if the lists are valid
+  """
+  validator = _Validator(ListReader(False)._column_count, duplicates)
+  protocols = [protocol] if protocol is not None else [None] + database.protocols()
+  checked = [p for p in protocols if _validate_protocol(validator, database, p)]
+  if not checked:
+    if protocol is None:
+      message = "No file lists were found in the directory '%s' or its sub-directories" % database.get_base_directory()
+    else:
+      message = "No file lists were found for the protocol '%s'" % protocol
+    validator.report('missing', None, None, message)
+  return validator.m_problems
+
+
+def _validate_protocol(validator, database, protocol):
+  """Checks the lists of the given protocol; returns ``False`` if the protocol has no lists."""
+  lists = collections.defaultdict(dict)
+  for group, type, list_file in database.list_files(protocol):
+    lists[group][type] = list_file
+  if not lists:
+    return False
+
+  world_clients = {}
+  for group in ('world', 'optional_world_1', 'optional_world_2'):
+    if group in lists:
+      list_file = lists[group][None]
+      world_clients[group] = set(row[4] for row in validator.rows(list_file, group, None))
+
+  group_clients = {}
+  for group in ('dev', 'eval'):
+    if group not in lists:
+      continue
+    group_lists = lists[group]
+    clients = set()
+    models, enroll_paths = {}, set()
+    if 'for_models' in group_lists:
+      models, enroll_paths = validator.models(group_lists['for_models'], group, 'for_models')
+      clients.update(models.values())
+
+    for type in ('for_probes', 'for_scores'):
+      if type not in group_lists:
+        continue
+      list_file = group_lists[type]
+      for number, path, model_id, claimed_id, client_id in validator.rows(list_file, group, type):
+        clients.add(client_id)
+        if path in enroll_paths:
+          validator.report('overlap', list_file, number, "The file '%s' is used for enrollment and for probing" % path)
+        if model_id is not None and 'for_models' in group_lists:
+          enrolled = models.get(model_id)
+          if enrolled is None:
+            validator.report('model', list_file, number, "The model '%s' is not enrolled" % model_id)
+          elif enrolled != claimed_id:
+            validator.report('model', list_file, number, "The model '%s' claims client '%s', but it is enrolled for client '%s'" % (model_id, claimed_id, enrolled))
+
+    tnorm_clients = znorm_clients = set()
+    if 'for_tnorm' in group_lists:
+      tnorm_models, _ = validator.models(group_lists['for_tnorm'], group, 'for_tnorm')
+      tnorm_clients = set(tnorm_models.values())
+      validator.overlap('cohort', group_lists['for_tnorm'], tnorm_clients, clients, "%d clients of the T-Norm cohort are enrolled or probed: %s")
+    if 'for_znorm' in group_lists:
+      znorm_clients = set(row[4] for row in validator.rows(group_lists['for_znorm'], group, 'for_znorm'))
+      validator.overlap('cohort', group_lists['for_znorm'], znorm_clients, clients, "%d clients of the Z-Norm cohort are enrolled or probed: %s")
+      validator.overlap('cohort', group_lists['for_znorm'], znorm_clients, tnorm_clients, "%d clients are contained in the T-Norm and in the Z-Norm cohort: %s")
+    group_clients[group] = clients
+
+  # clients must not leak between the world, dev and eval groups
+  suffix = " of the protocol '%s'" % protocol if protocol is not None else ''
+  groups = sorted(world_clients.items()) + sorted(group_clients.items())
+  for i, (first, first_clients) in enumerate(groups):
+    for second, second_clients in groups[i+1:]:
+      if first in world_clients and second in world_clients:
+        # the optional world groups might share clients with the world group
+        continue
+      validator.overlap('leakage', None, first_clients, second_clients, "%%d clients are contained in the '%s' and the '%s' group%s: %%s" % (first, second, suffix))
+  return True
@@ -48,6 +48,11 @@ setup(
 
     install_requires=install_requires,
 
+    # the NumPy arrays of the trials (see the arrays module and the export command) require NumPy
+    extras_require={
+      'arrays': ['numpy'],
+    },
+
 
 
     entry_points={